@@ -0,0 +1,214 @@
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import multiprocessing
+import socket
+import time
+import pandas as pd
+from aiohttp import web
+import forecasting
+from inflation.database import get_client, fetch_all
+from inflation.versioning import latest_version
+
+
+class CacheEntry:
+    def __init__(self, body):
+        # The body is serialized and compressed once, every hit reuses the bytes
+        self.body = body
+        self.gzipped = gzip.compress(body, compresslevel=6)
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+class ResponseCache:
+    def __init__(self, db, version_interval):
+        self.db = db
+        self.version_interval = version_interval
+        self.version = None
+        self.checked = None
+        self.entries = {}
+        # Responses being computed, concurrent requests for the same key wait on the same task
+        self.pending = {}
+
+    async def check_version(self):
+        # Look at the dataset version stamped by the crawler at most every version_interval seconds,
+        # cached responses stay valid until it moves
+        now = time.monotonic()
+        if self.checked is not None and now - self.checked < self.version_interval:
+            return
+        self.checked = now
+        try:
+            version, _ = await asyncio.get_running_loop().run_in_executor(None, latest_version, self.db)
+        except Exception as e:
+            # No version table or it cannot be read: keep the cached responses
+            print(f"Error reading dataset version: {e}")
+            version = self.version if self.version is not None else 0
+        if version != self.version:
+            self.entries = {}
+            self.version = version
+
+    async def get(self, key, compute):
+        await self.check_version()
+        entry = self.entries.get(key)
+        if entry is not None:
+            return entry
+
+        task = self.pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self.build(key, compute))
+            self.pending[key] = task
+        # Shield the computation so a client disconnecting does not cancel it for the others
+        return await asyncio.shield(task)
+
+    async def build(self, key, compute):
+        version = self.version
+        try:
+            # Supabase queries and model fits are blocking, run them in a thread
+            payload = await asyncio.get_running_loop().run_in_executor(None, compute)
+            if payload is None:
+                return None
+            entry = CacheEntry(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+            # Not cached if the version moved while it was computed
+            if version == self.version:
+                self.entries[key] = entry
+            return entry
+        finally:
+            self.pending.pop(key, None)
+
+
+class InflationAPI:
+    def __init__(self, version_interval=5):
+        self.db = get_client()
+        self.cache = ResponseCache(self.db, version_interval)
+        self.version_interval = version_interval
+
+    def application(self):
+        app = web.Application()
+        app.add_routes([
+            web.get('/metadata', self.metadata),
+            web.get(r'/years/{year:\d{4}}', self.year),
+            web.get('/countries/{country}', self.country),
+            web.get('/forecasts/{country}', self.forecasts),
+        ])
+        return app
+
+    def respond(self, request, entry):
+        if entry is None:
+            raise web.HTTPNotFound(text=json.dumps({'error': 'not found'}), content_type='application/json')
+
+        headers = {
+            'ETag': entry.etag,
+            # Clients revalidate with the ETag once the version could have moved
+            'Cache-Control': f'public, max-age={int(self.version_interval)}',
+            'Vary': 'Accept-Encoding',
+        }
+
+        # The client already has this version of the response
+        if_none_match = request.headers.get('If-None-Match', '')
+        if entry.etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*':
+            return web.Response(status=304, headers=headers)
+
+        body = entry.body
+        if 'gzip' in request.headers.get('Accept-Encoding', ''):
+            body = entry.gzipped
+            headers['Content-Encoding'] = 'gzip'
+        return web.Response(body=body, content_type='application/json', headers=headers)
+
+    def country_rows(self, country):
+        rows = fetch_all(self.db, 'inflation', country=country)
+        return sorted(rows, key=lambda row: row['year'])
+
+    async def metadata(self, request):
+        def compute():
+            rows = fetch_all(self.db, 'inflation', columns='country,year')
+            years = [row['year'] for row in rows]
+            return {
+                'countries': sorted(set(row['country'] for row in rows)),
+                'min_year': min(years) if years else None,
+                'max_year': max(years) if years else None,
+                'rows': len(rows),
+                'models': list(forecasting.MODELS),
+            }
+
+        return self.respond(request, await self.cache.get(('metadata',), compute))
+
+    async def year(self, request):
+        year = int(request.match_info['year'])
+
+        def compute():
+            return fetch_all(self.db, 'inflation', year=year) or None
+
+        return self.respond(request, await self.cache.get(('year', year), compute))
+
+    async def country(self, request):
+        country = request.match_info['country']
+
+        def compute():
+            return self.country_rows(country) or None
+
+        return self.respond(request, await self.cache.get(('country', country), compute))
+
+    async def forecasts(self, request):
+        country = request.match_info['country']
+
+        def compute():
+            rows = self.country_rows(country)
+            if not rows:
+                return None
+
+            df = pd.DataFrame(rows)
+            result = {'country': country}
+            for name, model in forecasting.MODELS.items():
+                # Only the forecasted years, the history is served by /countries
+                future = model(df).tail(forecasting.FORECAST_YEARS)
+                result[name] = [
+                    {'year': int(year), 'average_inflation': float(value), 'lower': float(lower), 'upper': float(upper)}
+                    for year, value, lower, upper in zip(future['year'], future['average_inflation'],
+                                                         future['lower'], future['upper'])
+                ]
+            return result
+
+        return self.respond(request, await self.cache.get(('forecasts', country), compute))
+
+
+def serve(sock, version_interval):
+    # Every worker process has its own client and cache and accepts on the shared socket
+    web.run_app(InflationAPI(version_interval).application(), sock=sock, print=None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read-only JSON API for the inflation data and forecasts.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=1, help="Number of server processes")
+    parser.add_argument('--version-interval', type=float, default=5,
+                        help="Seconds between checks of the dataset version, cached responses are dropped when it moves")
+    args = parser.parse_args()
+
+    # Bind once in the parent, the workers share the listening socket
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(128)
+    sock.set_inheritable(True)
+    print(f"Serving on http://{args.host}:{args.port} with {args.workers} worker(s)")
+
+    if args.workers <= 1:
+        serve(sock, args.version_interval)
+        return
+
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=serve, args=(sock, args.version_interval)) for _ in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,50 @@
+import os
+import threading
+import time
 import streamlit as st
 import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
 from supabase import create_client, Client
 from matplotlib.ticker import MaxNLocator
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import PolynomialFeatures
-from statsmodels.tsa.arima.model import ARIMA
+import forecasting
+from inflation.database import fetch_all
+from inflation.summary import summary_frame
+from inflation.versioning import latest_version
+from profiling import Profiler, profiled, PROFILE_LOG
+
+# Cached queries and forecasts. The dataset version is part of every cache key,
+# so cached values are reused until a crawl changes the data.
+# Arguments starting with an underscore are not hashed by Streamlit.
+@st.cache_data(show_spinner=False)
+def cached_query(_db, version, table_name, **kwargs):
+    query = _db.table(table_name).select('*')
+    for key, value in kwargs.items():
+        query = query.eq(key, value)
+    return query.execute().data
+
+
+@st.cache_data(show_spinner=False)
+def cached_fetch_all(_db, version, table_name, **kwargs):
+    return fetch_all(_db, table_name, **kwargs)
+
+
+@st.cache_data(show_spinner=False)
+def cached_forecast(version, model_name, country, _df):
+    return forecasting.MODELS[model_name](_df)
+
+
+# Last dataset version seen by this server, shared by every session
+@st.cache_resource
+def seen_version():
+    return {'version': None}
+
+
+# Every session runs the script in its own thread and pyplot keeps one global current figure,
+# so building and encoding a figure is serialized. The models are fitted outside of the lock.
+# The script is executed again on every rerun, a module-level lock would not be shared.
+@st.cache_resource
+def plot_lock():
+    return threading.RLock()
 
 
 class InflationApp:
@@ -14,246 +52,318 @@ class InflationApp:
         url = st.secrets["connections"]["supabase"]["SUPABASE_URL"]
         key = st.secrets["connections"]["supabase"]["SUPABASE_KEY"]
         self.db: Client = create_client(url, key)
+        self.version = None
+        # True while ui() runs the whole script, False when a fragment reruns on its own
+        self.full_run = False
+
+        # Opt-in debug mode, with ?debug=true in the URL or INFLATION_APP_DEBUG=1:
+        # the sections of every rerun are timed and shown in the sidebar, those of a fragment rerun
+        # in the fragment. Anyone can open ?debug=true, it only shows the timings on screen. The memory
+        # tracing and the log file, which slow down and grow on the server, need INFLATION_APP_DEBUG=1
+        server_debug = os.getenv('INFLATION_APP_DEBUG') == '1'
+        if 'profiler' not in st.session_state:
+            st.session_state['profiler'] = Profiler()
+        self.profiler = st.session_state['profiler']
+        self.profiler.trace_memory = server_debug
+        self.profiler.log_path = PROFILE_LOG if server_debug else None
+        self.profiler.enabled = st.query_params.get('debug', '').lower() in ('1', 'true') or server_debug
+
+    # Function to check the dataset version stamped by the crawler.
+    # The caches are only dropped when the version moves
+    def refresh_version(self):
+        seen = seen_version()
+        try:
+            self.version, _ = latest_version(self.db)
+        except Exception as e:
+            # No version table or it cannot be read: keep the version seen last, 0 if none,
+            # so the pages still render and the caches are kept
+            print(f"Error reading dataset version: {e}")
+            self.version = seen['version'] if seen['version'] is not None else 0
+        if seen['version'] != self.version:
+            if seen['version'] is not None:
+                cached_query.clear()
+                cached_fetch_all.clear()
+                cached_forecast.clear()
+            seen['version'] = self.version
+
+    # Fragment reruns do not go through ui(), the fragments reading data check the version themselves
+    # so a new crawl is shown right away and not after the next full rerun
+    def fragment_version_check(self):
+        if not self.full_run:
+            with self.profiler.section('version check'):
+                self.refresh_version()
 
     # Function to query the Supabase database
-    # Only rerun when the query changes or after 10 minutes.
+    # Only rerun when the query changes or the dataset version moves.
     def run_query(self, table_name, **kwargs):
-        query = self.db.table(table_name).select('*')
-        for key, value in kwargs.items():
-            query = query.eq(key, value)
-        return query.execute()
+        with self.profiler.section(f"fetch {table_name}"):
+            return cached_query(self.db, self.version, table_name, **kwargs)
 
     # Function to get the list of countries
     def get_countries(self):
-        result = self.run_query('inflation').data
+        result = self.run_query('inflation')
 
         # Extract country names from the result
         countries = sorted(set(item['country'] for item in result))
         countries.sort()  # Sort countries alphabetically
         return countries
 
-    def regression_model(self, df):
-        df = df[['year', 'average_inflation']]
-        df = df.dropna()
-        # set variables
-        X = df[['year']]
-        y = df['average_inflation']
-
-        # Train the model
-        model = LinearRegression()
-        model.fit(X, y)
-
-        # Make predictions for the next 10 years
-        future_years = np.arange(df['year'].max() + 1, df['year'].max() + 11).reshape(-1, 1)
-        future_predictions = model.predict(future_years)
-
-        # Create a DataFrame for future predictions
-        future_df = pd.DataFrame({
-            'year': future_years.flatten(),
-            'average_inflation': future_predictions
+    # Function to get the monthly series of a country between two years (inclusive)
+    # None when the table cannot be read, monthly ingestion is an opt-in crawl mode
+    def get_monthly(self, country, start_year, end_year):
+        try:
+            with self.profiler.section('fetch inflation_monthly'):
+                rows = cached_fetch_all(self.db, self.version, 'inflation_monthly',
+                                        columns='year,month,monthly_inflation,yearly_inflation',
+                                        order=('year', 'month'), ranges={'year': (start_year, end_year)},
+                                        country=country)
+        except Exception as e:
+            print(f"Error reading monthly inflation: {e}")
+            return None
+        df = pd.DataFrame(rows, columns=['year', 'month', 'monthly_inflation', 'yearly_inflation'])
+        df['Month'] = pd.to_datetime(df[['year', 'month']].assign(day=1))
+        return df.rename(columns={
+            'monthly_inflation': 'Monthly Inflation',
+            'yearly_inflation': 'Yearly Inflation'
+        }).set_index('Month')[['Monthly Inflation', 'Yearly Inflation']]
+
+    # Function to get the summary statistics materialized by the crawler
+    # None when the table is empty or cannot be read, the page then computes the statistics itself
+    def get_summary(self, scope, key):
+        try:
+            rows = self.run_query('inflation_summary', scope=scope, key=str(key))
+        except Exception as e:
+            print(f"Error reading summary statistics: {e}")
+            return None
+        if not rows:
+            return None
+
+        # Same layout and column names as DataFrame.describe() on the renamed data
+        return summary_frame(rows).rename(columns={
+            'average_inflation': 'Average Inflation',
+            'annual_inflation': 'Annual Inflation'
         })
 
-        # Combine historical data with future predictions
-        combined_df = pd.concat([df, future_df])
+    # Function to get the backtest error tables of a country, one column per model
+    # None when the backtest was not saved or the table cannot be read, the accuracy section is then skipped
+    def get_backtest_errors(self, country):
+        try:
+            rows = self.run_query('forecast_errors', country=country)
+        except Exception as e:
+            print(f"Error reading forecast errors: {e}")
+            return None
+        if not rows:
+            return None
+
+        df = pd.DataFrame(rows).rename(columns={
+            'horizon': 'Years Ahead',
+            'model': 'Model'
+        })
+        df['Model'] = df['Model'].map({
+            'linear': 'Linear Regression',
+            'polynomial': 'Polynomial Regression',
+            'arima': 'ARIMA(5, 1, 1)'
+        })
+        return {metric: df.pivot(index='Years Ahead', columns='Model', values=metric) for metric in ['mae', 'rmse']}
 
-        return combined_df
+    def regression_model(self, df, country):
+        with self.profiler.section('fit linear'):
+            return cached_forecast(self.version, 'linear', country, df)
 
     def plot_regression(self, df, selected_country):
         # Plot using the regression model dataframe
-        combined_df = self.regression_model(df)
-
-        plt.figure(figsize=(10, 6))
-        plt.plot(combined_df['year'], combined_df['average_inflation'], ls='--', color='#ff0000',
-                 label='Forecasted Inflation')
-        plt.plot(df['year'], df['average_inflation'], color='#00ffff', label='Historical Inflation')
-        plt.xlabel('Year', color='white')
-        plt.ylabel('Average Inflation', color='white')
-        plt.title(f'Inflation Forecast for {selected_country}', color='white')
-        plt.legend()
-        plt.grid(True, color='#c0c0c0', linewidth=0.1)
-
-        # Customize axis labels and ticks
-        ax = plt.gca()
-        ax.xaxis.label.set_color('white')
-        ax.yaxis.label.set_color('white')
-        ax.tick_params(axis='x', colors='white')
-        ax.tick_params(axis='y', colors='white')
-
-        # Set the background color to be transparent
-        plt.gca().set_facecolor('none')
-        plt.gcf().patch.set_facecolor('none')
-        # Plot the image
-        st.pyplot(plt)
-
-    def regression_model_poly(self, df):
-        df = df[['year', 'average_inflation']]
-        df = df.dropna()
-        # Set variables
-        X = df[['year']]
-        y = df['average_inflation']
-
-        # Add polynomial features
-        poly = PolynomialFeatures(degree=3)
-        X_poly = poly.fit_transform(X)
-
-        # Train the model
-        model = LinearRegression()
-        model.fit(X_poly, y)
-
-        # Make predictions for the next 10 years
-        future_years = np.arange(df['year'].max() + 1, df['year'].max() + 11).reshape(-1, 1)
-        future_years_poly = poly.transform(future_years)
-        future_predictions = model.predict(future_years_poly)
-
-        # Create a DataFrame for future predictions
-        future_df = pd.DataFrame({
-            'year': future_years.flatten(),
-            'average_inflation': future_predictions
-        })
+        combined_df = self.regression_model(df, selected_country)
+
+        with plot_lock():
+            plt.figure(figsize=(10, 6))
+            plt.plot(combined_df['year'], combined_df['average_inflation'], ls='--', color='#ff0000',
+                     label='Forecasted Inflation')
+            self.plot_interval(combined_df, '#ff0000', 'Prediction Interval')
+            plt.plot(df['year'], df['average_inflation'], color='#00ffff', label='Historical Inflation')
+            plt.xlabel('Year', color='white')
+            plt.ylabel('Average Inflation', color='white')
+            plt.title(f'Inflation Forecast for {selected_country}', color='white')
+            plt.legend()
+            plt.grid(True, color='#c0c0c0', linewidth=0.1)
+
+            # Customize axis labels and ticks
+            ax = plt.gca()
+            ax.xaxis.label.set_color('white')
+            ax.yaxis.label.set_color('white')
+            ax.tick_params(axis='x', colors='white')
+            ax.tick_params(axis='y', colors='white')
 
-        # Combine historical data with future predictions
-        combined_df = pd.concat([df, future_df])
+            # Set the background color to be transparent
+            plt.gca().set_facecolor('none')
+            plt.gcf().patch.set_facecolor('none')
+            # Plot the image
+            self.show_figure(plt)
 
-        return combined_df
+    def regression_model_poly(self, df, country):
+        with self.profiler.section('fit polynomial'):
+            return cached_forecast(self.version, 'polynomial', country, df)
 
     def plot_regression_poly(self, df, selected_country):
-        # Plot using the regression model dataframe
-        combined_df = self.regression_model(df)
-
-        plt.figure(figsize=(10, 6))
-        plt.plot(combined_df['year'], combined_df['average_inflation'], ls='--', color='#ff0000',
-                 label='Forecasted Inflation')
-        plt.plot(df['year'], df['average_inflation'], color='#00ffff', label='Historical Inflation')
-        plt.xlabel('Year', color='white')
-        plt.ylabel('Average Inflation', color='white')
-        plt.title(f'Inflation Forecast for {selected_country}', color='white')
-        plt.legend()
-        plt.grid(True, color='#c0c0c0', linewidth=0.1)
-
-        # Customize axis labels and ticks
-        ax = plt.gca()
-        ax.xaxis.label.set_color('white')
-        ax.yaxis.label.set_color('white')
-        ax.tick_params(axis='x', colors='white')
-        ax.tick_params(axis='y', colors='white')
-
-        # Set the background color to be transparent
-        plt.gca().set_facecolor('none')
-        plt.gcf().patch.set_facecolor('none')
-        # Plot the image
-        st.pyplot(plt)
-
-    def arima_model(self, df):
-        df = df[['year', 'average_inflation']]
-        df = df.dropna()
-        # Ensure 'average_inflation' is numeric
-        df['average_inflation'] = pd.to_numeric(df['average_inflation'], errors='coerce')
-        df = df.dropna(subset=['average_inflation'])
-
-        y = df['average_inflation'].values
-
-        # Fit the ARIMA model
-        model = ARIMA(y, order=(5, 1, 1))
-        model_fit = model.fit()
-
-        # Make predictions for the next 10 years
-        future_steps = 10
-        forecast = model_fit.forecast(steps=future_steps)
-
-        # Create a DataFrame for future predictions
-        future_years = np.arange(df['year'].max() + 1, df['year'].max() + 1 + future_steps)
-        future_df = pd.DataFrame({
-            'year': future_years,
-            'average_inflation': forecast
-        })
+        # Plot using the polynomial regression model dataframe
+        combined_df = self.regression_model_poly(df, selected_country)
+
+        with plot_lock():
+            plt.figure(figsize=(10, 6))
+            plt.plot(combined_df['year'], combined_df['average_inflation'], ls='--', color='#ff0000',
+                     label='Forecasted Inflation')
+            self.plot_interval(combined_df, '#ff0000', 'Prediction Interval')
+            plt.plot(df['year'], df['average_inflation'], color='#00ffff', label='Historical Inflation')
+            plt.xlabel('Year', color='white')
+            plt.ylabel('Average Inflation', color='white')
+            plt.title(f'Inflation Forecast for {selected_country}', color='white')
+            plt.legend()
+            plt.grid(True, color='#c0c0c0', linewidth=0.1)
+
+            # Customize axis labels and ticks
+            ax = plt.gca()
+            ax.xaxis.label.set_color('white')
+            ax.yaxis.label.set_color('white')
+            ax.tick_params(axis='x', colors='white')
+            ax.tick_params(axis='y', colors='white')
 
-        # Combine historical data with future predictions
-        combined_df = pd.concat([df, future_df])
+            # Set the background color to be transparent
+            plt.gca().set_facecolor('none')
+            plt.gcf().patch.set_facecolor('none')
+            # Plot the image
+            self.show_figure(plt)
 
-        return combined_df
+    def arima_model(self, df, country):
+        with self.profiler.section('fit arima'):
+            return cached_forecast(self.version, 'arima', country, df)
 
     def plot_arima(self, df, selected_country):
         # Plot using the ARIMA model dataframe
-        combined_df = self.arima_model(df)
-
-        plt.figure(figsize=(10, 6))
-        plt.plot(combined_df['year'], combined_df['average_inflation'], ls='--', color='#ff0000',
-                 label='Forecasted Inflation')
-        plt.plot(df['year'], df['average_inflation'], color='#00ffff', label='Historical Inflation')
-        plt.xlabel('Year', color='white')
-        plt.ylabel('Average Inflation', color='white')
-        plt.title(f'Inflation Forecast for {selected_country}', color='white')
-        plt.legend()
-        plt.grid(True, color='#c0c0c0', linewidth=0.1)
-
-        # Customize axis labels and ticks
-        ax = plt.gca()
-        ax.xaxis.label.set_color('white')
-        ax.yaxis.label.set_color('white')
-        ax.tick_params(axis='x', colors='white')
-        ax.tick_params(axis='y', colors='white')
-
-        # Set the background color to be transparent
-        plt.gca().set_facecolor('none')
-        plt.gcf().patch.set_facecolor('none')
-        # Plot the image
-        st.pyplot(plt)
+        combined_df = self.arima_model(df, selected_country)
+
+        with plot_lock():
+            plt.figure(figsize=(10, 6))
+            plt.plot(combined_df['year'], combined_df['average_inflation'], ls='--', color='#ff0000',
+                     label='Forecasted Inflation')
+            self.plot_interval(combined_df, '#ff0000', 'Prediction Interval')
+            plt.plot(df['year'], df['average_inflation'], color='#00ffff', label='Historical Inflation')
+            plt.xlabel('Year', color='white')
+            plt.ylabel('Average Inflation', color='white')
+            plt.title(f'Inflation Forecast for {selected_country}', color='white')
+            plt.legend()
+            plt.grid(True, color='#c0c0c0', linewidth=0.1)
+
+            # Customize axis labels and ticks
+            ax = plt.gca()
+            ax.xaxis.label.set_color('white')
+            ax.yaxis.label.set_color('white')
+            ax.tick_params(axis='x', colors='white')
+            ax.tick_params(axis='y', colors='white')
+
+            # Set the background color to be transparent
+            plt.gca().set_facecolor('none')
+            plt.gcf().patch.set_facecolor('none')
+            # Plot the image
+            self.show_figure(plt)
 
     def combined_forecast(self, df, selected_country):
-        combined_df_poly = self.regression_model(df)
-        combined_df_arima = self.arima_model(df)
-
-        plt.figure(figsize=(10, 6))
-        plt.plot(combined_df_poly['year'], combined_df_poly['average_inflation'], ls='--', color='#ff0000',
-                 label='Polynomial Forecasted Inflation')
-        plt.plot(combined_df_arima['year'], combined_df_arima['average_inflation'], ls='--', color='#00ff00',
-                 label='ARIMA Forecasted Inflation')
-        plt.plot(df['year'], df['average_inflation'], color='#00ffff', label='Historical Inflation')
-        plt.xlabel('Year', color='white')
-        plt.ylabel('Average Inflation', color='white')
-        plt.title(f'Inflation Forecast for {selected_country}', color='white')
-        plt.legend()
-        plt.grid(True, color='#c0c0c0', linewidth=0.1)
-
-        # Customize axis labels and ticks
-        ax = plt.gca()
-        ax.xaxis.label.set_color('white')
-        ax.yaxis.label.set_color('white')
-        ax.tick_params(axis='x', colors='white')
-        ax.tick_params(axis='y', colors='white')
-
-        # Set the background color to be transparent
-        plt.gca().set_facecolor('none')
-        plt.gcf().patch.set_facecolor('none')
-        # Plot the image
-        st.pyplot(plt)
+        combined_df_poly = self.regression_model_poly(df, selected_country)
+        combined_df_arima = self.arima_model(df, selected_country)
+
+        with plot_lock():
+            plt.figure(figsize=(10, 6))
+            plt.plot(combined_df_poly['year'], combined_df_poly['average_inflation'], ls='--', color='#ff0000',
+                     label='Polynomial Forecasted Inflation')
+            self.plot_interval(combined_df_poly, '#ff0000', 'Polynomial Prediction Interval')
+            plt.plot(combined_df_arima['year'], combined_df_arima['average_inflation'], ls='--', color='#00ff00',
+                     label='ARIMA Forecasted Inflation')
+            self.plot_interval(combined_df_arima, '#00ff00', 'ARIMA Prediction Interval')
+            plt.plot(df['year'], df['average_inflation'], color='#00ffff', label='Historical Inflation')
+            plt.xlabel('Year', color='white')
+            plt.ylabel('Average Inflation', color='white')
+            plt.title(f'Inflation Forecast for {selected_country}', color='white')
+            plt.legend()
+            plt.grid(True, color='#c0c0c0', linewidth=0.1)
+
+            # Customize axis labels and ticks
+            ax = plt.gca()
+            ax.xaxis.label.set_color('white')
+            ax.yaxis.label.set_color('white')
+            ax.tick_params(axis='x', colors='white')
+            ax.tick_params(axis='y', colors='white')
+
+            # Set the background color to be transparent
+            plt.gca().set_facecolor('none')
+            plt.gcf().patch.set_facecolor('none')
+            # Plot the image
+            self.show_figure(plt)
+
+    def plot_interval(self, combined_df, color, label):
+        # Shaded band between the bounds of the forecasted years
+        future = combined_df.tail(forecasting.FORECAST_YEARS)
+        plt.fill_between(future['year'], future['lower'], future['upper'], color=color, alpha=0.2, linewidth=0,
+                         label=f"{forecasting.INTERVAL:.0%} {label}")
+
+    def show_figure(self, fig):
+        # Encoding the figure to an image is the costly part of st.pyplot
+        with self.profiler.section('encode figure'):
+            st.pyplot(fig)
+
+    def show_timing(self, section, start):
+        # Debug mode only, the visitors of the app do not need the timings
+        if not self.profiler.enabled:
+            return
+        st.caption(f"{section} rendered in {1000 * (time.perf_counter() - start):.0f} ms")
 
     def display_inflation_data(self):
         # Streamlit UI
         st.title(":earth_americas: World CPI Inflation")
 
+        # The sections are fragments, a widget only reruns the section it belongs to:
+        # changing the year never refits the country models, moving a bin slider only updates its readout
+        self.year_section()
+
+        st.title(":japan: Countries Average CPI Inflation")
+
+        # Description for countries
+        st.write("Next you can select a country and see the inflation values for each recorded year. "
+                 "The line plot shows how the inflation values developed over the years.")
+
+        self.country_section()
+
+    @st.fragment
+    @profiled('year section', show=True)
+    def year_section(self):
+        start = time.perf_counter()
+        self.fragment_version_check()
+
         # Year picker
         selected_year = st.slider("Select a year", min_value=1956, max_value=2024, value=2024)
 
         # Display all users from the database
-        result = self.run_query('inflation', year=selected_year).data
+        result = self.run_query('inflation', year=selected_year)
 
         # Convert the result into a DataFrame for easier handling
-        df = pd.DataFrame(result)
-        # Rename columns
-        df = df.rename(columns={
-            'year': 'Year',
-            'country': 'Country',
-            'average_inflation': 'Average Inflation',
-            'annual_inflation': 'Annual Inflation'
-        })
+        with self.profiler.section('dataframe'):
+            df = pd.DataFrame(result)
+            # Rename columns
+            df = df.rename(columns={
+                'year': 'Year',
+                'country': 'Country',
+                'average_inflation': 'Average Inflation',
+                'annual_inflation': 'Annual Inflation'
+            })
 
         st.subheader(f"Inflation Data for {selected_year}")
         st.write(df[['Year', 'Country', 'Average Inflation', 'Annual Inflation']])
 
         # Summary statistics
         st.subheader(f"Summary Statistics for {selected_year}")
-        st.write(df[["Average Inflation", "Annual Inflation"]].describe())
+        with self.profiler.section('summary'):
+            summary = self.get_summary('year', selected_year)
+            if summary is None:
+                # Summary not materialized yet, compute it from the year data
+                summary = df[["Average Inflation", "Annual Inflation"]].describe()
+        st.write(summary[["Average Inflation", "Annual Inflation"]])
 
         # Determine min and max inflation values
         min_inflation = df['Average Inflation'].min()
@@ -264,25 +374,27 @@ class InflationApp:
 
         # Histogram for distribution
         st.subheader(f"Normalized Average Inflation Distribution for {selected_year}")
-        fig, ax = plt.subplots()
-        counts, bins, patches = plt.hist(df['Average Inflation'], bins=100, color='cyan', edgecolor='black',
-                                         density=True, stacked=True)
-
-        # Set ax colors and labels
-        ax.set_xlabel('Inflation Percentage', color='white')
-        ax.set_ylabel('Probability Density', color='white')
-        ax.xaxis.label.set_color('white')
-        ax.yaxis.label.set_color('white')
-        ax.tick_params(axis='x', colors='white')
-        ax.tick_params(axis='y', colors='white')
-
-        # Set x-axis ticks
-        ax.xaxis.set_major_locator(MaxNLocator(nbins=15))
-
-        # Set the background color to be transparent
-        plt.gca().set_facecolor('none')
-        plt.gcf().patch.set_facecolor('none')
-        st.pyplot(fig)
+        with plot_lock():
+            fig, ax = plt.subplots()
+            with self.profiler.section('histogram'):
+                counts, bins, patches = plt.hist(df['Average Inflation'], bins=100, color='cyan', edgecolor='black',
+                                                 density=True, stacked=True)
+
+            # Set ax colors and labels
+            ax.set_xlabel('Inflation Percentage', color='white')
+            ax.set_ylabel('Probability Density', color='white')
+            ax.xaxis.label.set_color('white')
+            ax.yaxis.label.set_color('white')
+            ax.tick_params(axis='x', colors='white')
+            ax.tick_params(axis='y', colors='white')
+
+            # Set x-axis ticks
+            ax.xaxis.set_major_locator(MaxNLocator(nbins=15))
+
+            # Set the background color to be transparent
+            plt.gca().set_facecolor('none')
+            plt.gcf().patch.set_facecolor('none')
+            self.show_figure(fig)
 
         # Description
         st.write("*Normalization of Histogram*: When a histogram is normalized, "
@@ -297,19 +409,7 @@ class InflationApp:
                  "The probability of a value falling within a specific interval is found by multiplying "
                  "the height (density) by the width of the interval, which you can try below.")
 
-        # Bin selection slider
-        st.subheader("Select a bin to see the probability")
-        selected_bin = st.slider("Select bin for the average inflation", 0, 99, 0)
-
-        # Calculate the probability for the selected bin
-        selected_density = counts[selected_bin]
-        selected_bin_start = bins[selected_bin]
-        selected_bin_end = bins[selected_bin + 1]
-        selected_bin_probability = selected_density * bin_width
-
-        st.write(f"Selected bin: {selected_bin}")
-        st.write(f"Bin range: {selected_bin_start:.2f} to {selected_bin_end:.2f}")
-        st.write(f"Probability: {selected_bin_probability:.4f} or {100 * selected_bin_probability:.2f}%")
+        self.bin_probability('average', counts, bins, bin_width)
 
         if not df['Annual Inflation'].isnull().all():
             # Determine min and max inflation values
@@ -320,53 +420,66 @@ class InflationApp:
             bin_width_annual = (max_annual_inflation - min_annual_inflation) / 100
 
             st.subheader(f"Normalized Annual Inflation Distribution for {selected_year} (dec vs. dec)")
-            fig2, ax2 = plt.subplots()
-            # Drop None values if any
-            df_annual_inflation = df['Annual Inflation'].dropna()
-
-            counts2, bins2, patches2 = plt.hist(df_annual_inflation, bins=100, color='red', edgecolor='black',
-                                                density=True,
-                                                stacked=True)
-
-            # Set ax colors and labels
-            ax2.set_xlabel('Inflation Percentage', color='white')
-            ax2.set_ylabel('Probability Density', color='white')
-            ax2.xaxis.label.set_color('white')
-            ax2.yaxis.label.set_color('white')
-            ax2.tick_params(axis='x', colors='white')
-            ax2.tick_params(axis='y', colors='white')
+            with plot_lock():
+                fig2, ax2 = plt.subplots()
+                # Drop None values if any
+                df_annual_inflation = df['Annual Inflation'].dropna()
+
+                with self.profiler.section('histogram'):
+                    counts2, bins2, patches2 = plt.hist(df_annual_inflation, bins=100, color='red', edgecolor='black',
+                                                        density=True,
+                                                        stacked=True)
+
+                # Set ax colors and labels
+                ax2.set_xlabel('Inflation Percentage', color='white')
+                ax2.set_ylabel('Probability Density', color='white')
+                ax2.xaxis.label.set_color('white')
+                ax2.yaxis.label.set_color('white')
+                ax2.tick_params(axis='x', colors='white')
+                ax2.tick_params(axis='y', colors='white')
+
+                # Set x-axis ticks
+                ax2.xaxis.set_major_locator(MaxNLocator(nbins=15))
+
+                # Set the background color to be transparent
+                plt.gca().set_facecolor('none')
+                plt.gcf().patch.set_facecolor('none')
+                self.show_figure(fig2)
+
+            self.bin_probability('annual', counts2, bins2, bin_width_annual)
 
-            # Set x-axis ticks
-            ax2.xaxis.set_major_locator(MaxNLocator(nbins=15))
+        else:
+            st.write(":heavy_exclamation_mark: :red[Annual inflation is not displayed since the data "
+                     "compares the inflation for December last year and December for the current year.]")
 
-            # Set the background color to be transparent
-            plt.gca().set_facecolor('none')
-            plt.gcf().patch.set_facecolor('none')
-            st.pyplot(fig2)
+        self.show_timing('Year section', start)
 
-            # Bin selection slider
-            st.subheader("Select a bin to see the probability")
-            selected_bin2 = st.slider("Select bin for the annual inflation", 0, 99, 0)
+    @st.fragment
+    @profiled('bin probability', show=True)
+    def bin_probability(self, inflation, counts, bins, bin_width):
+        start = time.perf_counter()
 
-            # Calculate the probability for the selected bin
-            selected_density2 = counts2[selected_bin2]
-            selected_bin_start2 = bins2[selected_bin2]
-            selected_bin_end2 = bins2[selected_bin2 + 1]
-            selected_bin_probability2 = selected_density2 * bin_width_annual
+        # Bin selection slider
+        st.subheader("Select a bin to see the probability")
+        selected_bin = st.slider(f"Select bin for the {inflation} inflation", 0, 99, 0)
 
-            st.write(f"Selected bin: {selected_bin2}")
-            st.write(f"Bin range: {selected_bin_start2:.2f} to {selected_bin_end2:.2f}")
-            st.write(f"Probability: {selected_bin_probability2:.4f} or {100 * selected_bin_probability2:.2f}%")
+        # Calculate the probability for the selected bin
+        selected_density = counts[selected_bin]
+        selected_bin_start = bins[selected_bin]
+        selected_bin_end = bins[selected_bin + 1]
+        selected_bin_probability = selected_density * bin_width
 
-        else:
-            st.write(":heavy_exclamation_mark: :red[Annual inflation is not displayed since the data "
-                     "compares the inflation for December last year and December for the current year.]")
+        st.write(f"Selected bin: {selected_bin}")
+        st.write(f"Bin range: {selected_bin_start:.2f} to {selected_bin_end:.2f}")
+        st.write(f"Probability: {selected_bin_probability:.4f} or {100 * selected_bin_probability:.2f}%")
 
-        st.title(":japan: Countries Average CPI Inflation")
+        self.show_timing('Bin probability', start)
 
-        # Description for countries
-        st.write("Next you can select a country and see the inflation values for each recorded year. "
-                 "The line plot shows how the inflation values developed over the years.")
+    @st.fragment
+    @profiled('country section', show=True)
+    def country_section(self):
+        start = time.perf_counter()
+        self.fragment_version_check()
 
         # Get list of countries for the selectbox
         countries = self.get_countries()
@@ -374,27 +487,36 @@ class InflationApp:
 
         if selected_country:
             # Display data for the selected country
-            inflation_line = self.run_query('inflation', country=selected_country).data
-            df_line = pd.DataFrame(inflation_line)
-            # Renamed DataFrame
-            df_renamed = df_line.rename(columns={
-                'year': 'Year',
-                'country': 'Country',
-                'average_inflation': 'Average Inflation',
-                'annual_inflation': 'Annual Inflation'
-            })
-            df_line.sort_values(by='year', inplace=True)
+            inflation_line = self.run_query('inflation', country=selected_country)
+            with self.profiler.section('dataframe'):
+                df_line = pd.DataFrame(inflation_line)
+                # Renamed DataFrame
+                df_renamed = df_line.rename(columns={
+                    'year': 'Year',
+                    'country': 'Country',
+                    'average_inflation': 'Average Inflation',
+                    'annual_inflation': 'Annual Inflation'
+                })
+                df_line.sort_values(by='year', inplace=True)
             st.subheader(f"Inflation Data for {selected_country}")
             st.write(df_renamed[['Year', 'Country', 'Average Inflation', 'Annual Inflation']])
 
             # Summary statistics for country
             st.subheader(f"Summary Statistics for {selected_country}")
-            st.write(df_renamed["Average Inflation"].describe())
+            with self.profiler.section('summary'):
+                summary_country = self.get_summary('country', selected_country)
+                if summary_country is None:
+                    # Summary not materialized yet, compute it from the country data
+                    summary_country = df_renamed[["Average Inflation"]].describe()
+            st.write(summary_country["Average Inflation"])
 
             # Create the line chart with both average and annual inflation
             st.line_chart(df_renamed.set_index('Year')[['Average Inflation', 'Annual Inflation']],
                           color=['#00ffff', '#ff0000'], use_container_width=True)
 
+            # Monthly figures, only the selected range of years is queried
+            self.monthly_section(selected_country, int(df_line['year'].min()), int(df_line['year'].max()))
+
             st.subheader(":chart_with_upwards_trend: Predictive models")
             st.write("Here you can see how one could implement models to predict future inflation values. "
                      "There are three different models, pros and cons are shown for each one.\n"
@@ -425,7 +547,6 @@ class InflationApp:
                      "only shows correlation over time, not causation. It cannot explain why inflation changes, "
                      "merely that it has changed over time.\n"
                      "* The model may either overfit or underfit the data, leading to poor predictive performance.")
-            self.regression_model(df_line)
             self.plot_regression(df_line, selected_country)
 
             st.write("*Polynomial Regression model*\n"
@@ -448,7 +569,6 @@ class InflationApp:
                      "* Extrapolation Risk - Predictions outside the range of the data can be unreliable and extreme.")
 
             # Run and plot polynomial model
-            self.regression_model_poly(df_line)
             self.plot_regression_poly(df_line, selected_country)
 
             st.write("*ARIMA (AutoRegressive Integrated Moving Average)*\n"
@@ -502,13 +622,47 @@ class InflationApp:
                      "large datasets or complex models.")
 
             # Run and plot ARIMA model
-            self.arima_model(df_line)
             self.plot_arima(df_line, selected_country)
 
             st.write("Finally, in this plot you can see how the Polynomial and the ARIMA model compare.")
             # Plot combined forecast
             self.combined_forecast(df_line, selected_country)
 
+            # Backtest errors computed offline by backtest.py
+            errors = self.get_backtest_errors(selected_country)
+            if errors is not None:
+                st.subheader(f"Forecast Accuracy for {selected_country}")
+                st.write("Each model was refitted on every year from the 20th onwards and used to forecast "
+                         "the following years, then compared with the recorded values (walk-forward backtest). "
+                         "The tables show the mean absolute error (MAE) and the root mean squared error (RMSE), "
+                         "in percentage points, for each number of years ahead.")
+                st.write("*Mean Absolute Error*")
+                st.write(errors['mae'])
+                st.write("*Root Mean Squared Error*")
+                st.write(errors['rmse'])
+
+            self.show_timing('Country section', start)
+
+    @st.fragment
+    @profiled('monthly section', show=True)
+    def monthly_section(self, selected_country, first_year, last_year):
+        start = time.perf_counter()
+        self.fragment_version_check()
+
+        if first_year < last_year:
+            st.subheader(f"Monthly CPI Inflation for {selected_country}")
+            start_year, end_year = st.slider("Select the years", min_value=first_year, max_value=last_year,
+                                             value=(max(first_year, last_year - 5), last_year))
+            df_monthly = self.get_monthly(selected_country, start_year, end_year)
+            if df_monthly is None:
+                st.write("Monthly data is not available.")
+            elif not df_monthly.empty:
+                st.line_chart(df_monthly, color=['#00ffff', '#ff0000'], use_container_width=True)
+            else:
+                st.write("There is no monthly data for the selected years.")
+
+            self.show_timing('Monthly section', start)
+
     def sidebar(self):
         st.sidebar.title("Navigation")
         selection = st.sidebar.radio("Go to", ["Home", "Inflation Data", "References"])
@@ -562,8 +716,36 @@ class InflationApp:
             st.markdown(":link: [Guide to Time Series Forecasting Models](https://medium.com/"
                         "@wainaina.pierre/the-complete-guide-to-time-series-forecasting-models-ef9c8cd40037)")
 
+    def profiling_panel(self):
+        if not self.profiler.enabled:
+            return
+
+        # Sections of the full rerun, fragment reruns cannot draw in the sidebar (see show_profile)
+        st.sidebar.subheader("Profiling")
+        records = pd.DataFrame(self.profiler.records, columns=['section', 'ms', 'allocated_kb', 'peak_kb'])
+        st.sidebar.dataframe(records, hide_index=True)
+        if self.profiler.log_path:
+            st.sidebar.caption(f"Run {self.profiler.run_id}, records appended to {self.profiler.log_path}")
+        else:
+            st.sidebar.caption(f"Run {self.profiler.run_id}")
+
+    def show_profile(self, records):
+        # Sections of a fragment, drawn at the end of the fragment so its reruns show them too
+        with st.expander("Profiling"):
+            st.dataframe(pd.DataFrame(records, columns=['section', 'ms', 'allocated_kb', 'peak_kb']),
+                         hide_index=True)
+
     def ui(self):
-        self.sidebar()
+        self.profiler.start_run()
+        self.full_run = True
+        try:
+            with self.profiler.section('rerun'):
+                with self.profiler.section('version check'):
+                    self.refresh_version()
+                self.sidebar()
+        finally:
+            self.full_run = False
+        self.profiling_panel()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,175 @@
+import argparse
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.arima.model import ARIMA
+import forecasting
+from inflation.database import get_client, fetch_all
+
+# Smallest number of years a model is trained on before its first forecast
+MIN_TRAIN_YEARS = 20
+
+# Polynomial degree of the regression models, as in the app
+REGRESSION_DEGREES = {'linear': 1, 'polynomial': 3}
+
+# Shared memory with every series, attached once by each ARIMA worker
+_shared = None
+_series = None
+
+
+def load_series(client, countries=None):
+    rows = fetch_all(client, 'inflation', columns='country,year,average_inflation')
+    df = pd.DataFrame(rows, columns=['country', 'year', 'average_inflation'])
+    df['average_inflation'] = pd.to_numeric(df['average_inflation'], errors='coerce')
+    df = df.dropna().sort_values(['country', 'year'])
+    if countries:
+        df = df[df['country'].isin(countries)]
+
+    # One (years, values) pair per country
+    return {country: (group['year'].to_numpy(dtype=float), group['average_inflation'].to_numpy(dtype=float))
+            for country, group in df.groupby('country')}
+
+
+def origin_targets(n, min_train, horizons):
+    # Forecast origins (number of training years) and the index forecasted at every horizon
+    origins = np.arange(min_train, n)
+    targets = origins[:, None] + np.arange(horizons)[None, :]
+    return origins, targets, targets < n
+
+
+def regression_errors(years, values, degree, min_train, horizons):
+    n = len(values)
+    origins, targets, valid = origin_targets(n, min_train, horizons)
+    if len(origins) == 0:
+        return None
+
+    # Rescaling the years keeps the cubic design well conditioned, the fitted curve is the same
+    x = (years - years[0]) / max(years[-1] - years[0], 1)
+    X = np.vander(x, degree + 1, increasing=True)
+
+    # Running sums of X'X and X'y give the normal equations of every expanding window at once,
+    # all refits are then a single batched solve
+    xtx = np.cumsum(X[:, :, None] * X[:, None, :], axis=0)
+    xty = np.cumsum(X * values[:, None], axis=0)
+    coefficients = np.linalg.solve(xtx[origins - 1], xty[origins - 1][:, :, None])[:, :, 0]
+
+    targets = np.where(valid, targets, n - 1)
+    predictions = np.einsum('ohk,ok->oh', X[targets], coefficients)
+    return np.where(valid, predictions - values[targets], np.nan)
+
+
+def attach_series(name, size):
+    global _shared, _series
+    _shared = shared_memory.SharedMemory(name=name)
+    _series = np.ndarray((size,), dtype=np.float64, buffer=_shared.buf)
+    warnings.simplefilter('ignore')
+
+
+def arima_forecast(task):
+    # The worker reads the training window straight from shared memory
+    start, train, steps = task
+    try:
+        model_fit = ARIMA(_series[start:start + train].copy(), order=forecasting.ARIMA_ORDER).fit()
+        return model_fit.forecast(steps=steps)
+    except Exception:
+        return np.full(steps, np.nan)
+
+
+def arima_errors(series, min_train, horizons, workers):
+    # Every series is copied once into a single shared block instead of being pickled per task
+    offsets = {}
+    position = 0
+    for country, (_, values) in series.items():
+        offsets[country] = position
+        position += len(values)
+
+    block = shared_memory.SharedMemory(create=True, size=max(position, 1) * 8)
+    try:
+        flat = np.ndarray((position,), dtype=np.float64, buffer=block.buf)
+        tasks = []
+        for country, (_, values) in series.items():
+            flat[offsets[country]:offsets[country] + len(values)] = values
+            for origin in range(min_train, len(values)):
+                tasks.append((country, origin, (offsets[country], origin, horizons)))
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=attach_series,
+                                 initargs=(block.name, position)) as pool:
+            forecasts = list(pool.map(arima_forecast, [task for _, _, task in tasks],
+                                      chunksize=max(1, len(tasks) // (4 * (workers or os.cpu_count() or 1)))))
+        del flat
+    finally:
+        block.close()
+        block.unlink()
+
+    errors = {}
+    for (country, origin, _), forecast in zip(tasks, forecasts):
+        values = series[country][1]
+        actual = values[origin:origin + horizons]
+        error = np.full(horizons, np.nan)
+        error[:len(actual)] = forecast[:len(actual)] - actual
+        errors.setdefault(country, []).append(error)
+    return {country: np.array(rows) for country, rows in errors.items()}
+
+
+def error_table(errors_by_model):
+    # MAE and RMSE per model, country and horizon
+    rows = []
+    for model, errors_by_country in errors_by_model.items():
+        for country, errors in errors_by_country.items():
+            for horizon in range(errors.shape[1]):
+                error = errors[:, horizon]
+                error = error[~np.isnan(error)]
+                if len(error) == 0:
+                    continue
+                rows.append({
+                    'model': model,
+                    'country': country,
+                    'horizon': horizon + 1,
+                    'mae': float(np.mean(np.abs(error))),
+                    'rmse': float(np.sqrt(np.mean(error ** 2))),
+                    'n': int(len(error))
+                })
+    return pd.DataFrame(rows, columns=['model', 'country', 'horizon', 'mae', 'rmse', 'n'])
+
+
+def backtest(series, min_train=MIN_TRAIN_YEARS, horizons=forecasting.FORECAST_YEARS, workers=None):
+    errors_by_model = {}
+    for model, degree in REGRESSION_DEGREES.items():
+        errors_by_model[model] = {}
+        for country, (years, values) in series.items():
+            errors = regression_errors(years, values, degree, min_train, horizons)
+            if errors is not None:
+                errors_by_model[model][country] = errors
+    errors_by_model['arima'] = arima_errors(series, min_train, horizons, workers)
+    return error_table(errors_by_model)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the forecasting models.")
+    parser.add_argument('--countries', nargs='*', help="Countries to evaluate, all by default")
+    parser.add_argument('--min-train', type=int, default=MIN_TRAIN_YEARS,
+                        help="Years used to train the first forecast")
+    parser.add_argument('--horizons', type=int, default=forecasting.FORECAST_YEARS,
+                        help="Number of years forecasted from every origin")
+    parser.add_argument('--workers', type=int, default=None, help="ARIMA worker processes")
+    parser.add_argument('--output', default='backtest_errors.csv', help="CSV file for the error table")
+    parser.add_argument('--save', action='store_true', help="Store the error table in the forecast_errors table")
+    args = parser.parse_args()
+
+    client = get_client()
+    series = load_series(client, args.countries)
+    table = backtest(series, args.min_train, args.horizons, args.workers)
+
+    table.to_csv(args.output, index=False)
+    print(f"Error table saved: {args.output} ({len(table)} rows)")
+    if args.save and not table.empty:
+        client.table('forecast_errors').upsert(table.to_dict(orient='records'),
+                                               on_conflict='model,country,horizon').execute()
+        print("Error table saved to forecast_errors")
+
+
+if __name__ == '__main__':
+    main()
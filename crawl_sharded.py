@@ -0,0 +1,68 @@
+import argparse
+import os
+import subprocess
+import sys
+from inflation.database import get_client
+from inflation.deadletter import DeadLetterQueue
+from inflation.frontier import Frontier, MAX_ATTEMPTS
+from inflation.summary import save_summary
+from inflation.versioning import stamp_version, stored_records
+
+
+def finalize(client):
+    # The shards only saw part of the data: compute the summary statistics and stamp the
+    # dataset version once, from everything the shards stored
+    saved = save_summary(client, DeadLetterQueue())
+    if saved:
+        print(f"Summary statistics saved: {saved} rows")
+
+    # Hashed like DatasetVersionPipeline does, from the stored tables
+    records = stored_records(client)
+    if records:
+        print(f"Dataset version: {stamp_version(client, records)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the spider in several processes sharing one frontier.")
+    parser.add_argument('--shards', type=int, default=os.cpu_count() or 1, help="Number of crawler processes")
+    parser.add_argument('--frontier', default='frontier.sqlite3', help="SQLite file of the shared frontier")
+    parser.add_argument('--mode', default='annual', choices=['annual', 'monthly', 'all'])
+    parser.add_argument('--resume', action='store_true', help="Keep the frontier of a previous run and retry its abandoned URLs")
+    args = parser.parse_args()
+
+    if not args.resume:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.frontier + suffix):
+                os.remove(args.frontier + suffix)
+    # Create the frontier before the shards start so they do not race to create the table
+    frontier = Frontier(args.frontier)
+    if args.resume:
+        retried = frontier.retry_abandoned()
+        if retried:
+            print(f"Retrying {retried} abandoned URLs")
+    frontier.close()
+
+    shards = [subprocess.Popen([sys.executable, '-m', 'scrapy', 'crawl', 'inflationspider',
+                                '-a', f'mode={args.mode}', '-a', f'frontier={args.frontier}', '-a', f'shard={i}'])
+              for i in range(args.shards)]
+    codes = [shard.wait() for shard in shards]
+
+    frontier = Frontier(args.frontier)
+    print(f"Frontier: {frontier.counts()}")
+    abandoned = frontier.abandoned()
+    frontier.close()
+    if any(codes):
+        print(f"Shards exited with codes {codes}, summary and version not updated")
+        raise SystemExit(1)
+    if abandoned:
+        # The stored data is incomplete, rerun with --resume to retry these pages
+        for url in abandoned:
+            print(f"Abandoned after {MAX_ATTEMPTS} attempts: {url}")
+        print(f"{len(abandoned)} URLs abandoned, summary and version not updated")
+        raise SystemExit(1)
+
+    finalize(get_client())
+
+
+if __name__ == '__main__':
+    main()
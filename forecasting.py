@@ -0,0 +1,203 @@
+import multiprocessing
+import os
+import threading
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+from sklearn.preprocessing import PolynomialFeatures
+from statsmodels.tsa.arima.model import ARIMA
+
+# Number of future years predicted by every model
+FORECAST_YEARS = 10
+
+# Resamples behind the prediction intervals, and the probability an interval covers the future value
+BOOTSTRAP_SAMPLES = 1000
+INTERVAL = 0.9
+
+ARIMA_ORDER = (5, 1, 1)
+
+# Processes simulating the ARIMA paths, started on first use. The simulations run outside of the
+# app's process so they do not hold the GIL shared by the sessions.
+# The pool is created from session or executor threads: the workers are spawned, forking a process
+# with other threads running can copy locks held by them, and the lock keeps two threads from
+# creating a pool each.
+ARIMA_WORKERS = min(4, os.cpu_count() or 1)
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def bootstrap_interval(years, values, future_years, degree, samples=BOOTSTRAP_SAMPLES, seed=0):
+    # Residual bootstrap: every resample refits the curve to the fitted values plus residuals drawn
+    # with replacement. All resamples share the design matrix, so they are solved together as one
+    # least-squares problem with a right-hand side per resample.
+    # Rescaling the years keeps the cubic design well conditioned, the fitted curve is the same
+    scale = max(years.max() - years.min(), 1)
+    X = np.vander((years - years.min()) / scale, degree + 1, increasing=True)
+    X_future = np.vander((future_years - years.min()) / scale, degree + 1, increasing=True)
+
+    fitted = X @ np.linalg.lstsq(X, values, rcond=None)[0]
+    residuals = values - fitted
+    rng = np.random.default_rng(seed)
+    resampled = fitted[:, None] + rng.choice(residuals, size=(len(values), samples))
+    coefficients = np.linalg.lstsq(X, resampled, rcond=None)[0]
+
+    # A resampled residual is added to every prediction, so the interval covers the future values
+    # and not only the fitted curve
+    predictions = X_future @ coefficients + rng.choice(residuals, size=(len(future_years), samples))
+    return np.quantile(predictions, [(1 - INTERVAL) / 2, (1 + INTERVAL) / 2], axis=1)
+
+
+def simulate_arima(task):
+    # Future paths of the fitted model from the end of the series, one column per repetition
+    values, params, steps, repetitions, seed = task
+    warnings.simplefilter('ignore')
+    results = ARIMA(values, order=ARIMA_ORDER).filter(params)
+    return results.simulate(steps, repetitions=repetitions, anchor='end', random_state=seed).reshape(steps, -1)
+
+
+def arima_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=ARIMA_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def shutdown_arima_pool():
+    # Stop the workers, e.g. to read their resource usage once they exited
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def arima_interval(values, params, steps, samples=BOOTSTRAP_SAMPLES, seed=0):
+    global _pool
+    pool = arima_pool()
+
+    # The repetitions are split over the workers, each chunk with its own random stream
+    chunks = [len(chunk) for chunk in np.array_split(np.arange(samples), ARIMA_WORKERS) if len(chunk)]
+    seeds = np.random.SeedSequence(seed).generate_state(len(chunks))
+    tasks = [(values, params, steps, repetitions, int(chunk_seed)) for repetitions, chunk_seed in zip(chunks, seeds)]
+    try:
+        paths = np.concatenate(list(pool.map(simulate_arima, tasks)), axis=1)
+    except BrokenProcessPool:
+        # A worker died, the next forecast starts a new pool
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        raise
+    return np.quantile(paths, [(1 - INTERVAL) / 2, (1 + INTERVAL) / 2], axis=1)
+
+
+def regression_model(df):
+    df = df[['year', 'average_inflation']]
+    df = df.dropna()
+    # set variables
+    X = df[['year']]
+    y = df['average_inflation']
+
+    # Train the model
+    model = LinearRegression()
+    model.fit(X, y)
+
+    # Make predictions for the next 10 years
+    future_years = np.arange(df['year'].max() + 1, df['year'].max() + 1 + FORECAST_YEARS).reshape(-1, 1)
+    future_predictions = model.predict(future_years)
+    lower, upper = bootstrap_interval(X['year'].to_numpy(dtype=float), y.to_numpy(dtype=float),
+                                      future_years.flatten().astype(float), degree=1)
+
+    # Create a DataFrame for future predictions
+    future_df = pd.DataFrame({
+        'year': future_years.flatten(),
+        'average_inflation': future_predictions,
+        'lower': lower,
+        'upper': upper
+    })
+
+    # Combine historical data with future predictions
+    combined_df = pd.concat([df, future_df])
+
+    return combined_df
+
+
+def regression_model_poly(df):
+    df = df[['year', 'average_inflation']]
+    df = df.dropna()
+    # Set variables
+    X = df[['year']]
+    y = df['average_inflation']
+
+    # Add polynomial features
+    poly = PolynomialFeatures(degree=3)
+    X_poly = poly.fit_transform(X)
+
+    # Train the model
+    model = LinearRegression()
+    model.fit(X_poly, y)
+
+    # Make predictions for the next 10 years
+    future_years = np.arange(df['year'].max() + 1, df['year'].max() + 1 + FORECAST_YEARS).reshape(-1, 1)
+    future_years_poly = poly.transform(future_years)
+    future_predictions = model.predict(future_years_poly)
+    lower, upper = bootstrap_interval(X['year'].to_numpy(dtype=float), y.to_numpy(dtype=float),
+                                      future_years.flatten().astype(float), degree=3)
+
+    # Create a DataFrame for future predictions
+    future_df = pd.DataFrame({
+        'year': future_years.flatten(),
+        'average_inflation': future_predictions,
+        'lower': lower,
+        'upper': upper
+    })
+
+    # Combine historical data with future predictions
+    combined_df = pd.concat([df, future_df])
+
+    return combined_df
+
+
+def arima_model(df):
+    df = df[['year', 'average_inflation']]
+    df = df.dropna()
+    # Ensure 'average_inflation' is numeric
+    df['average_inflation'] = pd.to_numeric(df['average_inflation'], errors='coerce')
+    df = df.dropna(subset=['average_inflation'])
+
+    y = df['average_inflation'].values
+
+    # Fit the ARIMA model
+    model = ARIMA(y, order=ARIMA_ORDER)
+    model_fit = model.fit()
+
+    # Make predictions for the next 10 years
+    future_steps = FORECAST_YEARS
+    forecast = model_fit.forecast(steps=future_steps)
+    # Intervals from paths simulated with the fitted parameters
+    lower, upper = arima_interval(y, model_fit.params, future_steps)
+
+    # Create a DataFrame for future predictions
+    future_years = np.arange(df['year'].max() + 1, df['year'].max() + 1 + future_steps)
+    future_df = pd.DataFrame({
+        'year': future_years,
+        'average_inflation': forecast,
+        'lower': lower,
+        'upper': upper
+    })
+
+    # Combine historical data with future predictions
+    combined_df = pd.concat([df, future_df])
+
+    return combined_df
+
+
+# Models served by the app and the API, by name
+MODELS = {
+    'linear': regression_model,
+    'polynomial': regression_model_poly,
+    'arima': arima_model,
+}
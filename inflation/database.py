@@ -0,0 +1,37 @@
+import os
+from dotenv import load_dotenv
+from supabase import create_client
+
+# Supabase returns at most 1000 rows per request, larger reads are paged
+PAGE_SIZE = 1000
+
+
+def get_client():
+    # Load environment variables from .env file
+    load_dotenv()
+    url = os.getenv('SUPABASE_URL')
+    key = os.getenv('SUPABASE_KEY')
+    if not url or not key:
+        raise ValueError("Supabase URL and Key must be set in environment variables")
+    return create_client(url, key)
+
+
+def fetch_all(client, table_name, columns='*', order=('country', 'year'), ranges=None, **kwargs):
+    # Read every row matching the filters, one page at a time.
+    # ranges bounds columns between two values (inclusive), e.g. ranges={'year': (2000, 2010)}.
+    # The rows are ordered so pages do not overlap or skip rows
+    rows = []
+    start = 0
+    while True:
+        query = client.table(table_name).select(columns)
+        for key, value in kwargs.items():
+            query = query.eq(key, value)
+        for key, (lower, upper) in (ranges or {}).items():
+            query = query.gte(key, lower).lte(key, upper)
+        for column in order:
+            query = query.order(column)
+        page = query.range(start, start + PAGE_SIZE - 1).execute().data
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        start += PAGE_SIZE
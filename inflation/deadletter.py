@@ -0,0 +1,73 @@
+import fcntl
+import json
+import os
+from datetime import datetime, timezone
+
+# Default file for the writes that failed, relative to the directory the crawl runs in
+DEAD_LETTER_FILE = 'dead_letters.jsonl'
+
+
+class DeadLetterQueue:
+    def __init__(self, path=DEAD_LETTER_FILE):
+        self.path = path
+
+    def append(self, table_name, record, error, on_conflict=None, retries=0):
+        self.append_many(table_name, [record], error, on_conflict, retries)
+
+    def append_many(self, table_name, records, error, on_conflict=None, retries=0):
+        failed_at = datetime.now(timezone.utc).isoformat()
+        # One line per failed record, flushed to disk before the crawl moves on
+        with self.open_locked() as file:
+            for record in records:
+                file.write(json.dumps({
+                    'table': table_name,
+                    'on_conflict': on_conflict,
+                    'record': record,
+                    'error': str(error),
+                    'retries': retries,
+                    'failed_at': failed_at
+                }, default=str) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+
+    def open_locked(self):
+        # Shards of a sharded crawl append to the same file and replay.py swaps it,
+        # reopen if the file was replaced while waiting for the lock
+        while True:
+            file = open(self.path, 'a', encoding='utf-8')
+            fcntl.flock(file, fcntl.LOCK_EX)
+            if os.path.exists(self.path) and os.fstat(file.fileno()).st_ino == os.stat(self.path).st_ino:
+                return file
+            file.close()
+
+    def read_lines(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, encoding='utf-8') as file:
+            return [line for line in file if line.strip()]
+
+    def load(self):
+        # Entries currently in the queue and the number of lines they were read from
+        lines = self.read_lines()
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                print(f"Skipping unreadable dead letter: {line.strip()}")
+        return entries, len(lines)
+
+    def replace(self, entries, consumed):
+        # Keep the given entries plus any line appended after the first `consumed` lines were loaded,
+        # the file is swapped atomically so a crash never leaves it half written
+        with self.open_locked():
+            # No crawler can append between reading the new lines and swapping the file
+            appended = self.read_lines()[consumed:]
+            temporary = self.path + '.tmp'
+            with open(temporary, 'w', encoding='utf-8') as file:
+                for entry in entries:
+                    file.write(json.dumps(entry, default=str) + '\n')
+                file.writelines(appended)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary, self.path)
@@ -0,0 +1,94 @@
+import json
+import sqlite3
+import time
+
+# Requests are leased again once their lease expired, up to this many times
+MAX_ATTEMPTS = 3
+
+
+class Frontier:
+    # URL queue shared by the crawler processes of a sharded crawl, stored in a local SQLite file.
+    # Every URL is stored once (dedup), a process leases pending URLs, acks them once parsed,
+    # and URLs whose lease expired (the process died or the request failed) are leased again.
+
+    def __init__(self, path, lease_seconds=300):
+        self.lease_seconds = lease_seconds
+        # Autocommit mode, transactions are opened explicitly with BEGIN IMMEDIATE
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute("""
+            create table if not exists frontier (
+                url text primary key,
+                callback text not null,
+                meta text not null,
+                state text not null default 'pending',
+                owner text,
+                lease_expires real,
+                attempts integer not null default 0
+            )
+        """)
+        self.conn.execute('create index if not exists frontier_state on frontier (state, lease_expires)')
+
+    def push(self, url, callback='parse', meta=None):
+        # Returns False when the URL was already in the frontier
+        cursor = self.conn.execute('insert or ignore into frontier (url, callback, meta) values (?, ?, ?)',
+                                   (url, callback, json.dumps(meta or {})))
+        return cursor.rowcount == 1
+
+    def lease(self, owner, limit):
+        # Lease up to `limit` URLs that are pending or whose lease expired
+        now = time.time()
+        self.conn.execute('begin immediate')
+        try:
+            rows = self.conn.execute("""
+                select url, callback, meta from frontier
+                where (state = 'pending' or (state = 'leased' and lease_expires < ?)) and attempts < ?
+                limit ?
+            """, (now, MAX_ATTEMPTS, limit)).fetchall()
+            self.conn.executemany("""
+                update frontier set state = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1
+                where url = ?
+            """, [(owner, now + self.lease_seconds, url) for url, _, _ in rows])
+            self.conn.execute('commit')
+        except Exception:
+            self.conn.execute('rollback')
+            raise
+        return [(url, callback, json.loads(meta)) for url, callback, meta in rows]
+
+    def ack(self, url):
+        self.conn.execute("update frontier set state = 'done', owner = null, lease_expires = null where url = ?",
+                          (url,))
+
+    def release(self, url):
+        # Give the URL back right away instead of waiting for the lease to expire
+        self.conn.execute("update frontier set state = 'pending', owner = null, lease_expires = null "
+                          "where url = ? and state = 'leased'", (url,))
+
+    def counts(self):
+        return dict(self.conn.execute('select state, count(*) from frontier group by state').fetchall())
+
+    def is_finished(self):
+        # Nothing left to lease and no live lease that could still push new URLs
+        row = self.conn.execute("""
+            select count(*) from frontier
+            where (state = 'pending' and attempts < ?) or (state = 'leased' and (lease_expires >= ? or attempts < ?))
+        """, (MAX_ATTEMPTS, time.time(), MAX_ATTEMPTS)).fetchone()
+        return row[0] == 0
+
+    def abandoned(self):
+        # URLs given up after MAX_ATTEMPTS leases, the crawl that stored the others is incomplete
+        return [url for url, in self.conn.execute("""
+            select url from frontier
+            where state != 'done' and attempts >= ? and (state = 'pending' or lease_expires < ?)
+        """, (MAX_ATTEMPTS, time.time())).fetchall()]
+
+    def retry_abandoned(self):
+        # Lease the abandoned URLs again, with their attempts reset
+        cursor = self.conn.execute("""
+            update frontier set state = 'pending', owner = null, lease_expires = null, attempts = 0
+            where state != 'done' and attempts >= ? and (state = 'pending' or lease_expires < ?)
+        """, (MAX_ATTEMPTS, time.time()))
+        return cursor.rowcount
+
+    def close(self):
+        self.conn.close()
@@ -11,3 +11,11 @@ class InflationItem(scrapy.Item):
     year = scrapy.Field()
     annual_inflation = scrapy.Field()
     average_inflation = scrapy.Field()
+
+
+class MonthlyInflationItem(scrapy.Item):
+    country = scrapy.Field()
+    year = scrapy.Field()
+    month = scrapy.Field()
+    monthly_inflation = scrapy.Field()
+    yearly_inflation = scrapy.Field()
@@ -3,6 +3,8 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+import hashlib
+import json
 from scrapy import signals
 
 # useful for handling different item types with a single interface
@@ -56,6 +58,59 @@ class InflationSpiderMiddleware:
         spider.logger.info("Spider opened: %s" % spider.name)
 
 
+class ItemDeduplicationMiddleware:
+    # The same (country, year) row can be listed on several pages. Items are identified by
+    # their type and key fields and fingerprinted by their content: exact duplicates are dropped,
+    # conflicting duplicates are resolved by keeping the item with the most values,
+    # then the highest fingerprint, so the result does not depend on the crawl order.
+    key_fields = ('country', 'year', 'month')
+    missing_values = ('', '-', 'nan')
+
+    def __init__(self, stats):
+        self.stats = stats
+        # Item key -> (rank, fingerprint) of the item that was let through
+        self.seen = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.stats)
+
+    def process_spider_output(self, response, result, spider):
+        for i in result:
+            if is_item(i) and not self.keep(i, spider):
+                continue
+            yield i
+
+    def keep(self, item, spider):
+        adapter = ItemAdapter(item)
+        key = (type(item).__name__,) + tuple(adapter.get(field) for field in self.key_fields)
+        fingerprint = hashlib.sha1(json.dumps(adapter.asdict(), sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        values = sum(1 for value in adapter.values()
+                     if value is not None and str(value).strip().lower() not in self.missing_values)
+        rank = (values, fingerprint)
+
+        seen = self.seen.get(key)
+        if seen is None:
+            self.seen[key] = rank
+            self.stats.inc_value('item_dedup/unique')
+            return True
+
+        if seen[1] == fingerprint:
+            self.stats.inc_value('item_dedup/exact_dropped')
+            return False
+
+        self.stats.inc_value('item_dedup/conflicts')
+        if rank > seen:
+            # The new item wins, it is sent again and replaces the stored values
+            self.seen[key] = rank
+            self.stats.inc_value('item_dedup/conflicts_replaced')
+            spider.logger.info(f"Conflicting duplicate replaced: {key[1:]}")
+            return True
+
+        self.stats.inc_value('item_dedup/conflicts_dropped')
+        return False
+
+
 class InflationDownloaderMiddleware:
     # Not all methods need to be defined. If a method is not defined,
     # scrapy acts as if the downloader middleware does not modify the
@@ -1,7 +1,9 @@
-import os
-from dotenv import load_dotenv
-from supabase import create_client
 from itemadapter import ItemAdapter
+from inflation.database import get_client
+from inflation.deadletter import DeadLetterQueue, DEAD_LETTER_FILE
+from inflation.items import InflationItem, MonthlyInflationItem
+from inflation.summary import save_summary
+from inflation.versioning import stamp_version, stored_records
 
 
 class InflationPipeline:
@@ -19,7 +21,7 @@ class InflationPipeline:
                 adapter['year'] = None
 
         # Substitute unavailable values ('-' and 'nan') and convert to float
-        inflation_keys = ['annual_inflation', 'average_inflation']
+        inflation_keys = ['annual_inflation', 'average_inflation', 'monthly_inflation', 'yearly_inflation']
         for key in inflation_keys:
             value = adapter.get(key)
             if value is not None:
@@ -40,47 +42,144 @@ class InflationPipeline:
         return item
 
 
-class SaveToSupabasePipeline:
+# One Supabase client per process, shared by the storage pipelines
+_client = None
+
+
+def supabase_client():
+    global _client
+    if _client is None:
+        _client = get_client()
+    return _client
+
+
+class SupabasePipeline:
+    # Base of the storage pipelines: the shared Supabase client and the dead letter queue
     def __init__(self):
-        self.client = None
-        self.load_environment_variables()
-        self.initialize_supabase()
+        self.client = supabase_client()
+        self.dead_letters = DeadLetterQueue()
 
-    def load_environment_variables(self):
-        # Load environment variables from .env file
-        load_dotenv()
+    def open_spider(self, spider):
+        # Failed writes are spooled to the dead letter file and re-submitted with replay.py
+        self.dead_letters = DeadLetterQueue(spider.settings.get('DEAD_LETTER_FILE', DEAD_LETTER_FILE))
 
-    def initialize_supabase(self):
-        url = os.getenv('SUPABASE_URL')
-        key = os.getenv('SUPABASE_KEY')
-        if not url or not key:
-            raise ValueError("Supabase URL and Key must be set in environment variables")
-        self.client = create_client(url, key)
 
+class SaveToSupabasePipeline(SupabasePipeline):
     def process_item(self, item, spider):
+        # Monthly items are stored by SaveMonthlyToSupabasePipeline
+        if not isinstance(item, InflationItem):
+            return item
+
         adapter = ItemAdapter(item)
-        country = adapter.get('country')
-        year = adapter.get('year')
-        average_inflation = adapter.get('average_inflation')
-        annual_inflation = adapter.get('annual_inflation')
+        record = {
+            'country': adapter.get('country'),
+            'year': adapter.get('year'),
+            'average_inflation': adapter.get('average_inflation'),
+            'annual_inflation': adapter.get('annual_inflation')
+        }
 
         try:
-            # Check if the item already exists in the database
-            response = self.client.table('inflation').select('*').eq('country', country).eq('year', year).execute()
-
-            if response.data:
-                print(f"Item already exists: {country} {year}")
-            else:
-                # Insert the item into the database
-                self.client.table('inflation').insert({
-                    'country': country,
-                    'year': year,
-                    'average_inflation': average_inflation,
-                    'annual_inflation': annual_inflation
-                }).execute()
-                print(f"Item saved: {country} {year}")
+            # One upsert on the unique (country, year) index (see sql/inflation.sql): the deduplication runs
+            # in every shard of a sharded crawl, two shards saving the same row at once must not insert it twice.
+            # A row whose values changed, or a conflicting duplicate that won the deduplication, replaces the stored one
+            self.client.table('inflation').upsert(record, on_conflict='country,year').execute()
+            print(f"Item saved: {record['country']} {record['year']}")
 
         except Exception as e:
             print(f"Error processing item: {e}")
+            self.dead_letters.append('inflation', record, e, on_conflict='country,year')
 
         return item
+
+
+class SummaryStatisticsPipeline(SupabasePipeline):
+    # SaveToSupabasePipeline stores the annual rows as the items pass,
+    # they are all stored by the time close_spider runs
+
+    def __init__(self):
+        super().__init__()
+        self.items = 0
+
+    def process_item(self, item, spider):
+        if isinstance(item, InflationItem):
+            self.items += 1
+        return item
+
+    def close_spider(self, spider):
+        # A shard only sees part of the data, crawl_sharded.py runs this step once every shard finished
+        if not self.items or getattr(spider, 'shard', None) is not None:
+            return
+
+        try:
+            # Computed from the stored rows, the crawl may only have scraped part of them
+            saved = save_summary(self.client, self.dead_letters)
+            if saved:
+                print(f"Summary statistics saved: {saved} rows")
+        except Exception as e:
+            print(f"Error computing summary statistics: {e}")
+
+
+class SaveMonthlyToSupabasePipeline(SupabasePipeline):
+    # Monthly series have about 12 times more rows than the annual ones,
+    # they are written in bulk upserts instead of one select and insert per row
+    batch_size = 500
+
+    def __init__(self):
+        super().__init__()
+        self.batch = {}
+
+    def process_item(self, item, spider):
+        if not isinstance(item, MonthlyInflationItem):
+            return item
+
+        adapter = ItemAdapter(item)
+        # Keyed by the primary key, a month scraped twice is only sent once
+        self.batch[(adapter.get('country'), adapter.get('year'), adapter.get('month'))] = {
+            'country': adapter.get('country'),
+            'year': adapter.get('year'),
+            'month': adapter.get('month'),
+            'monthly_inflation': adapter.get('monthly_inflation'),
+            'yearly_inflation': adapter.get('yearly_inflation')
+        }
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+        return item
+
+    def flush(self):
+        rows = list(self.batch.values())
+        self.batch = {}
+        try:
+            self.client.table('inflation_monthly').upsert(rows, on_conflict='country,year,month').execute()
+            print(f"Monthly items saved: {len(rows)}")
+        except Exception as e:
+            print(f"Error saving monthly items: {e}")
+            self.dead_letters.append_many('inflation_monthly', rows, e, on_conflict='country,year,month')
+
+    def close_spider(self, spider):
+        if self.batch:
+            self.flush()
+
+
+class DatasetVersionPipeline(SupabasePipeline):
+    # Scrapy calls close_spider in the reverse order of the pipelines, this pipeline
+    # has the lowest order of the storage pipelines so the version is stamped after they flushed
+
+    def __init__(self):
+        super().__init__()
+        self.items = 0
+
+    def process_item(self, item, spider):
+        self.items += 1
+        return item
+
+    def close_spider(self, spider):
+        # A shard only sees part of the data, crawl_sharded.py runs this step once every shard finished
+        if not self.items or getattr(spider, 'shard', None) is not None:
+            return
+
+        try:
+            # Hashed from the stored tables, the crawl may only have scraped part of them
+            version = stamp_version(self.client, stored_records(self.client))
+            print(f"Dataset version: {version}")
+        except Exception as e:
+            print(f"Error saving dataset version: {e}")
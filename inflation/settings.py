@@ -47,9 +47,10 @@ ROBOTSTXT_OBEY = True
 
 # Enable or disable spider middlewares
 # See https://docs.scrapy.org/en/latest/topics/spider-middleware.html
-#SPIDER_MIDDLEWARES = {
-#    "inflation.middlewares.InflationSpiderMiddleware": 543,
-#}
+SPIDER_MIDDLEWARES = {
+    # "inflation.middlewares.InflationSpiderMiddleware": 543,
+    "inflation.middlewares.ItemDeduplicationMiddleware": 543,
+}
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
@@ -69,9 +70,15 @@ DOWNLOADER_MIDDLEWARES = {
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 ITEM_PIPELINES = {
     "inflation.pipelines.InflationPipeline": 300,
+    "inflation.pipelines.DatasetVersionPipeline": 350,
     "inflation.pipelines.SaveToSupabasePipeline": 400,
+    "inflation.pipelines.SaveMonthlyToSupabasePipeline": 450,
+    "inflation.pipelines.SummaryStatisticsPipeline": 500,
 }
 
+# File where item writes that failed are spooled, re-submit them with `python replay.py`
+DEAD_LETTER_FILE = "dead_letters.jsonl"
+
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
 #AUTOTHROTTLE_ENABLED = True
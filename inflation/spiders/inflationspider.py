@@ -1,7 +1,16 @@
 import scrapy
+import os
 import re
 import random
-from inflation.items import InflationItem
+import socket
+from scrapy import signals
+from scrapy.exceptions import DontCloseSpider
+from inflation.frontier import Frontier
+from inflation.items import InflationItem, MonthlyInflationItem
+
+# Month names as written on inflation.eu, in calendar order
+MONTHS = ['january', 'february', 'march', 'april', 'may', 'june',
+          'july', 'august', 'september', 'october', 'november', 'december']
 
 
 class InflationSpider(scrapy.Spider):
@@ -12,21 +21,103 @@ class InflationSpider(scrapy.Spider):
     # Initialize a set to store visited URLs
     visited_urls = set()
 
-    def parse(self, response):
-        # List of users
-        user_agent_list = [
-            'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/93.0.4577.82 '
-            'Safari/537.36',
-            'Mozilla/5.0 (iPhone; CPU iPhone OS 14_4_2 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) '
-            'Version/14.0.3 Mobile/15E148 Safari/604.1',
-            'Mozilla/4.0 (compatible; MSIE 9.0; Windows NT 6.1)',
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/87.0.4280.141 '
-            'Safari/537.36 Edg/87.0.664.75',
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/70.0.3538.102 '
-            'Safari/537.36 Edge/18.18363',
-        ]
+    # List of users
+    user_agent_list = [
+        'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36',
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/93.0.4577.82 '
+        'Safari/537.36',
+        'Mozilla/5.0 (iPhone; CPU iPhone OS 14_4_2 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) '
+        'Version/14.0.3 Mobile/15E148 Safari/604.1',
+        'Mozilla/4.0 (compatible; MSIE 9.0; Windows NT 6.1)',
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/87.0.4280.141 '
+        'Safari/537.36 Edg/87.0.664.75',
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/70.0.3538.102 '
+        'Safari/537.36 Edge/18.18363',
+    ]
+
+    def __init__(self, mode='annual', frontier=None, shard=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # 'annual' scrapes the yearly tables, 'monthly' the monthly tables of every country and year, 'all' both
+        # e.g. scrapy crawl inflationspider -a mode=monthly
+        if mode not in ('annual', 'monthly', 'all'):
+            raise ValueError(f"Unknown mode: {mode}")
+        self.mode = mode
+
+        # Sharded crawl (see crawl_sharded.py): pages are pulled from and pushed to a frontier
+        # shared with the other crawler processes instead of being followed directly
+        self.frontier = Frontier(frontier) if frontier else None
+        self.shard = shard
+        self.owner = f"{socket.gethostname()}-{os.getpid()}"
+        # Leased requests not yet parsed or failed, topped up to CONCURRENT_REQUESTS
+        self.in_flight = 0
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        crawler.signals.connect(spider.spider_idle, signal=signals.spider_idle)
+        return spider
+
+    def random_user_agent(self):
+        return self.user_agent_list[random.randint(0, len(self.user_agent_list) - 1)]
+
+    def start_requests(self):
+        if self.frontier is None:
+            yield from super().start_requests()
+            return
+
+        # Every shard seeds the start URLs, the frontier keeps each URL once
+        for url in self.start_urls:
+            self.frontier.push(url)
+        yield from self.refill()
+
+    def follow(self, response, url, callback, meta=None):
+        if self.frontier is None:
+            yield response.follow(url, callback=getattr(self, callback), meta=meta,
+                                  headers={"User-Agent": self.random_user_agent()})
+        else:
+            self.frontier.push(response.urljoin(url), callback, meta)
+
+    def lease_requests(self, limit):
+        for url, callback, meta in self.frontier.lease(self.owner, limit):
+            self.in_flight += 1
+            # The frontier already removed duplicates, a URL leased again must not be filtered
+            yield scrapy.Request(url, callback=getattr(self, callback), errback=self.frontier_failed,
+                                 meta=dict(meta, frontier_url=url), dont_filter=True,
+                                 headers={"User-Agent": self.random_user_agent()})
+
+    def refill(self):
+        # Lease enough pages to have CONCURRENT_REQUESTS in flight. A parsed page can push several
+        # new ones (e.g. the start page), so leasing one per parsed page would never grow past one
+        free = self.settings.getint('CONCURRENT_REQUESTS') - self.in_flight
+        if free > 0:
+            yield from self.lease_requests(free)
+
+    def frontier_done(self, response):
+        # Ack the parsed page and top up the requests in flight
+        if self.frontier is not None:
+            self.frontier.ack(response.meta['frontier_url'])
+            self.in_flight -= 1
+            yield from self.refill()
+
+    def frontier_failed(self, failure):
+        self.frontier.release(failure.request.meta['frontier_url'])
+        self.in_flight -= 1
+        yield from self.refill()
+
+    def spider_idle(self, spider):
+        if self.frontier is None:
+            return
+
+        # Nothing is in flight when the spider is idle, also covers callbacks that raised before the ack
+        self.in_flight = 0
+        requests = list(self.refill())
+        for request in requests:
+            self.crawler.engine.crawl(request)
+        # Other shards may still push pages while they hold leases
+        if requests or not self.frontier.is_finished():
+            raise DontCloseSpider
 
+    def parse(self, response):
         # Add the current URL to the visited URLs set
         self.visited_urls.add(response.url)
 
@@ -60,7 +151,14 @@ class InflationSpider(scrapy.Spider):
                     inflation_item['annual_inflation'] = annual_inflation
                     inflation_item['average_inflation'] = average_inflation
 
-                    yield inflation_item
+                    if self.mode in ('annual', 'all'):
+                        yield inflation_item
+
+                    # The row links to the historic page of the country for that year with the monthly figures
+                    country_page = row.css('a::attr(href)').get()
+                    if self.mode in ('monthly', 'all') and country_page:
+                        yield from self.follow(response, country_page, 'parse_monthly',
+                                               {'country': country, 'year': year})
 
         # Extract all links from the pagination table
         pagination_links = response.css('table.notelinkstable a.notelinks::attr(href)').getall()
@@ -72,6 +170,33 @@ class InflationSpider(scrapy.Spider):
             if next_page_url not in self.visited_urls:
                 # Add the next page URL to the visited set
                 self.visited_urls.add(next_page_url)
-                yield response.follow(next_page_url, callback=self.parse,
-                                      headers={"User-Agent": user_agent_list[random.randint(
-                                          0, len(user_agent_list) - 1)]})
+                yield from self.follow(response, next_page_url, 'parse')
+
+        yield from self.frontier_done(response)
+
+    def parse_monthly(self, response):
+        country = response.meta['country']
+
+        # Classes with inflation data
+        all_rows = response.css('tr.tabledata1') + response.css('tr.tabledata2')
+
+        for row in all_rows:
+            month_year = row.css('a::text').get() or row.css('td::text').get() or ''
+            td_values = row.css('td[align="right"]::text').getall()
+
+            if len(td_values) == 2:
+                # Extract month and year using regex, e.g. 'CPI Germany january 2023'
+                match = re.search(r'(' + '|'.join(MONTHS) + r') (\d{4})', month_year, re.IGNORECASE)
+                if match:
+                    # Initialize MonthlyInflationItem
+                    monthly_item = MonthlyInflationItem()
+                    monthly_item['country'] = country
+                    monthly_item['year'] = match.group(2)
+                    monthly_item['month'] = MONTHS.index(match.group(1).lower()) + 1
+                    # Remove other characters and leave inflation value
+                    monthly_item['monthly_inflation'] = td_values[0].replace('\xa0%', '').strip()
+                    monthly_item['yearly_inflation'] = td_values[1].replace('\xa0%', '').strip()
+
+                    yield monthly_item
+
+        yield from self.frontier_done(response)
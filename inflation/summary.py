@@ -0,0 +1,73 @@
+import pandas as pd
+from inflation.database import fetch_all
+
+# Inflation columns summarized for every year and every country
+SUMMARY_COLUMNS = ['average_inflation', 'annual_inflation']
+
+# Statistics produced by DataFrame.describe() and the summary table fields they are stored in
+STATISTIC_FIELDS = {
+    'count': 'count',
+    'mean': 'mean',
+    'std': 'std',
+    'min': 'min',
+    '25%': 'q25',
+    '50%': 'q50',
+    '75%': 'q75',
+    'max': 'max',
+}
+
+
+def compute_summary(records):
+    # Build one DataFrame with every cleaned item of the crawl
+    df = pd.DataFrame(list(records), columns=['country', 'year'] + SUMMARY_COLUMNS)
+    df[SUMMARY_COLUMNS] = df[SUMMARY_COLUMNS].apply(pd.to_numeric, errors='coerce')
+
+    rows = []
+    for scope in ('year', 'country'):
+        # A grouped describe() computes the statistics of every group in one pass
+        stats = df.dropna(subset=[scope]).groupby(scope)[SUMMARY_COLUMNS].describe()
+
+        # Move the inflation columns from the column index to the row index:
+        # one row per (key, column) and one column per statistic
+        stats = stats.stack(level=0, future_stack=True).rename(columns=STATISTIC_FIELDS)
+        stats.index.names = ['key', 'column']
+        stats = stats.reset_index()
+        stats['scope'] = scope
+        stats['key'] = stats['key'].astype(str)
+        stats['count'] = stats['count'].astype(int)
+
+        # Missing statistics (e.g. std of a single value) are stored as null
+        stats = stats.astype(object).where(stats.notna(), None)
+        rows.extend(stats.to_dict(orient='records'))
+
+    return rows
+
+
+def save_summary(client, dead_letters=None):
+    # Recompute the statistics of every year and country from the stored rows and upsert them.
+    # A crawl may have scraped part of the data (one mode, one shard, stopped early), the statistics
+    # of a country must cover all of its rows. Rows that could not be saved go to dead_letters
+    rows = compute_summary(fetch_all(client, 'inflation'))
+    if not rows:
+        return 0
+
+    try:
+        client.table('inflation_summary').upsert(rows, on_conflict='scope,key,column').execute()
+    except Exception as e:
+        if dead_letters is None:
+            raise
+        print(f"Error saving summary statistics: {e}")
+        dead_letters.append_many('inflation_summary', rows, e, on_conflict='scope,key,column')
+        return 0
+    return len(rows)
+
+
+def summary_frame(rows):
+    # Rebuild the DataFrame.describe() layout from summary table rows:
+    # statistics as the index and one column per inflation column
+    fields = list(STATISTIC_FIELDS.values())
+    df = pd.DataFrame(rows, columns=['column'] + fields).set_index('column')
+    df = df[fields].astype(float).T
+    df.index = list(STATISTIC_FIELDS.keys())
+    df.columns.name = None
+    return df
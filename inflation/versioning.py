@@ -0,0 +1,58 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from inflation.database import fetch_all
+
+
+def content_hash(records):
+    # Hash of the records independent of the order they were scraped in
+    lines = sorted(json.dumps(record, sort_keys=True, default=str) for record in records)
+    digest = hashlib.sha256()
+    for line in lines:
+        digest.update(line.encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+def stored_records(client):
+    # Every stored row of the annual and monthly tables. The version is computed from what is stored
+    # and not from what a crawl scraped, so annual, monthly and sharded crawls of unchanged data agree
+    records = [dict(row, type='InflationItem') for row in
+               fetch_all(client, 'inflation', columns='country,year,average_inflation,annual_inflation')]
+    try:
+        monthly = fetch_all(client, 'inflation_monthly', columns='country,year,month,monthly_inflation,yearly_inflation',
+                            order=('country', 'year', 'month'))
+    except Exception as e:
+        # Monthly ingestion is an opt-in crawl mode, without the table the version covers the annual rows
+        print(f"Monthly inflation not hashed: {e}")
+        monthly = []
+    records.extend(dict(row, type='MonthlyInflationItem') for row in monthly)
+    return records
+
+
+def latest_version(client):
+    # Latest dataset version and its content hash, (0, None) before the first crawl
+    rows = client.table('dataset_version').select('version,content_hash') \
+        .order('version', desc=True).limit(1).execute().data
+    if not rows:
+        return 0, None
+    return rows[0]['version'], rows[0]['content_hash']
+
+
+def stamp_version(client, records):
+    # Record a new dataset version only when the content changed, so readers
+    # keep their caches when a crawl finds the same data
+    records = list(records)
+    digest = content_hash(records)
+    version, previous_hash = latest_version(client)
+    if digest == previous_hash:
+        return version
+
+    version += 1
+    client.table('dataset_version').insert({
+        'version': version,
+        'content_hash': digest,
+        'rows': len(records),
+        'created_at': datetime.now(timezone.utc).isoformat()
+    }).execute()
+    return version
@@ -0,0 +1,290 @@
+import argparse
+import json
+import os
+import random
+import resource
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+from urllib import parse
+import numpy as np
+import streamlit as st
+import supabase
+from streamlit.runtime import Runtime
+from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.runtime.pages_manager import PagesManager
+from streamlit.runtime.secrets import Secrets
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+from streamlit.testing.v1.util import patch_config_options
+import forecasting
+from inflation.summary import compute_summary
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+
+# Steps of a simulated session, in order. AppTest reruns the whole script at every step, so the year
+# and country steps time full reruns and not the fragment reruns of a session in a browser
+STEPS = ['home', 'inflation data', 'year (full rerun)', 'country (full rerun)']
+
+
+class LocalResult:
+    def __init__(self, data):
+        self.data = data
+
+
+class LocalQuery:
+    # In-memory stand-in for the Supabase query builder, only the calls the app makes
+    def __init__(self, rows):
+        self.rows = rows
+        self.columns = None
+        self.orders = []
+        self.bounds = None
+        self.max_rows = None
+
+    def select(self, columns='*'):
+        self.columns = None if columns == '*' else columns.split(',')
+        return self
+
+    def eq(self, key, value):
+        self.rows = [row for row in self.rows if row.get(key) == value]
+        return self
+
+    def gte(self, key, value):
+        self.rows = [row for row in self.rows if row.get(key) is not None and row[key] >= value]
+        return self
+
+    def lte(self, key, value):
+        self.rows = [row for row in self.rows if row.get(key) is not None and row[key] <= value]
+        return self
+
+    def order(self, key, desc=False):
+        self.orders.append((key, desc))
+        return self
+
+    def limit(self, count):
+        self.max_rows = count
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end)
+        return self
+
+    def execute(self):
+        rows = list(self.rows)
+        for key, desc in reversed(self.orders):
+            rows.sort(key=lambda row: row[key], reverse=desc)
+        if self.bounds is not None:
+            rows = rows[self.bounds[0]:self.bounds[1] + 1]
+        if self.max_rows is not None:
+            rows = rows[:self.max_rows]
+        if self.columns is not None:
+            rows = [{column: row.get(column) for column in self.columns} for row in rows]
+        return LocalResult(rows)
+
+
+class LocalClient:
+    def __init__(self, tables):
+        self.tables = tables
+
+    def table(self, table_name):
+        return LocalQuery(self.tables.get(table_name, []))
+
+
+def synthetic_tables(countries=100, first_year=1956, last_year=2024, seed=0):
+    # Random walk inflation series shaped like the scraped data
+    rng = random.Random(seed)
+    rows = []
+    monthly = []
+    for i in range(countries):
+        country = f"Country {i:03d}"
+        level = rng.uniform(0, 8)
+        for year in range(first_year, last_year + 1):
+            level = max(-5.0, level + rng.gauss(0, 1.5))
+            rows.append({
+                'country': country,
+                'year': year,
+                'average_inflation': round(level, 2),
+                'annual_inflation': round(level + rng.gauss(0, 0.5), 2) if year > 1990 else None
+            })
+            for month in range(1, 13):
+                monthly.append({
+                    'country': country,
+                    'year': year,
+                    'month': month,
+                    'monthly_inflation': round(rng.gauss(level / 12, 0.2), 2),
+                    'yearly_inflation': round(level + rng.gauss(0, 0.3), 2)
+                })
+
+    return {
+        'inflation': rows,
+        'inflation_monthly': monthly,
+        'inflation_summary': compute_summary(rows),
+        'forecast_errors': [],
+        'dataset_version': [{'version': 1, 'content_hash': 'local'}]
+    }
+
+
+class SessionAppTest(AppTest):
+    # AppTest installs a mock Runtime and st.secrets before every run and removes them after it,
+    # which breaks sessions running in parallel threads. The harness installs them once for all
+    # sessions (see install_runtime) and a session run only executes the script, like a server does.
+
+    def _run(self, widget_state=None, timeout=None):
+        if timeout is None:
+            timeout = self.default_timeout
+
+        pages_manager = PagesManager(self._script_path, setup_watcher=False)
+        script_runner = LocalScriptRunner(self._script_path, self.session_state, pages_manager,
+                                          args=self.args, kwargs=self.kwargs)
+        self._tree = script_runner.run(widget_state, self.query_params, timeout, self._page_hash)
+        self._tree._runner = self
+        # Last event is SHUTDOWN, its data includes the query string
+        self.query_params = parse.parse_qs(script_runner.event_data[-1]["client_state"].query_string)
+        return self
+
+
+def install_runtime(client):
+    # One runtime for every session, so st.cache_data and st.cache_resource are shared as on a server
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+
+    secrets = Secrets()
+    secrets._secrets = {'connections': {'supabase': {'SUPABASE_URL': 'local', 'SUPABASE_KEY': 'local'}}}
+    st.secrets = secrets
+
+    # The app builds its client with `from supabase import create_client` on every run,
+    # so replacing the module attribute serves every session from the local tables
+    supabase.create_client = lambda url, key: client
+
+
+def widget(elements, label):
+    return next(element for element in elements if element.label == label)
+
+
+def run_session(years, countries, timeout):
+    # One simulated user: Home -> Inflation Data -> year slider -> country with its forecasts
+    timings = {}
+    errors = 0
+    # from_file always builds a plain AppTest, so the subclass is created directly
+    app = SessionAppTest(APP_FILE, default_timeout=timeout)
+
+    actions = [
+        ('home', lambda: app),
+        ('inflation data', lambda: app.sidebar.radio[0].set_value('Inflation Data')),
+        ('year (full rerun)', lambda: widget(app.slider, 'Select a year').set_value(random.choice(years))),
+        ('country (full rerun)',
+         lambda: widget(app.selectbox, 'Select a country').set_value(random.choice(countries))),
+    ]
+    for step, action in actions:
+        start = time.perf_counter()
+        try:
+            action().run()
+            errors += len(app.exception)
+        except Exception as e:
+            print(f"Error in step {step}: {e!r}")
+            errors += 1
+        timings[step] = time.perf_counter() - start
+    return timings, errors
+
+
+def percentiles(values):
+    values = np.array(values) * 1000
+    return {
+        'p50_ms': round(float(np.percentile(values, 50)), 1),
+        'p95_ms': round(float(np.percentile(values, 95)), 1),
+        'p99_ms': round(float(np.percentile(values, 99)), 1),
+        'max_ms': round(float(values.max()), 1)
+    }
+
+
+def load_test(sessions, concurrency, tables, timeout=300):
+    years = sorted(set(row['year'] for row in tables['inflation']))
+    countries = sorted(set(row['country'] for row in tables['inflation']))
+
+    install_runtime(LocalClient(tables))
+
+    samples = {step: [] for step in STEPS}
+    errors = 0
+    lock = threading.Lock()
+
+    def session(_):
+        nonlocal errors
+        timings, session_errors = run_session(years, countries, timeout)
+        with lock:
+            for step, elapsed in timings.items():
+                samples[step].append(elapsed)
+            errors += session_errors
+
+    start = time.perf_counter()
+    with patch_config_options({"global.appTest": True}):
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(session, range(sessions)))
+    elapsed = time.perf_counter() - start
+    # ru_maxrss of the children only counts the processes that exited, the ARIMA workers are stopped first
+    forecasting.shutdown_arima_pool()
+
+    report = {
+        'sessions': sessions,
+        'concurrency': concurrency,
+        'errors': errors,
+        'seconds': round(elapsed, 2),
+        'sessions_per_second': round(sessions / elapsed, 3),
+        'reruns_per_second': round(sessions * len(STEPS) / elapsed, 3),
+        'reruns': 'full script, AppTest cannot rerun a fragment on its own',
+        # ru_maxrss is in kilobytes on Linux. For the children it is the peak of the largest ARIMA worker,
+        # the workers together use up to forecasting.ARIMA_WORKERS times as much
+        'peak_memory_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'peak_worker_memory_mb': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+        'arima_workers': forecasting.ARIMA_WORKERS,
+        'steps': {step: percentiles(values) for step, values in samples.items() if values}
+    }
+    return report
+
+
+def regressions(report, baseline, tolerance):
+    # Steps whose p95 latency grew by more than the tolerance compared with the baseline
+    found = []
+    for step, stats in report['steps'].items():
+        previous = baseline.get('steps', {}).get(step)
+        if previous and stats['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            found.append(f"{step}: p95 {stats['p95_ms']} ms, baseline {previous['p95_ms']} ms")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive concurrent simulated sessions through the app.")
+    parser.add_argument('--sessions', type=int, default=20, help="Total number of simulated sessions")
+    parser.add_argument('--concurrency', type=int, default=4, help="Sessions running at the same time")
+    parser.add_argument('--countries', type=int, default=100, help="Countries in the synthetic data")
+    parser.add_argument('--timeout', type=float, default=300, help="Seconds a single rerun may take")
+    parser.add_argument('--output', help="Write the report to this JSON file")
+    parser.add_argument('--baseline', help="Report of a previous run to compare the p95 latencies with")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Allowed p95 increase over the baseline before the run fails (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    report = load_test(args.sessions, args.concurrency, synthetic_tables(args.countries), args.timeout)
+    print(json.dumps(report, indent=2))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+
+    failed = report['errors'] > 0
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            found = regressions(report, json.load(file), args.tolerance)
+        for regression in found:
+            print(f"Regression: {regression}")
+        failed = failed or bool(found)
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+import json
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+from datetime import datetime, timezone
+
+# Structured timing records of the debug mode, one JSON object per line
+PROFILE_LOG = 'profile_log.jsonl'
+
+
+class Profiler:
+    # Times the sections of a rerun and, with trace_memory, measures the memory they allocate with tracemalloc.
+    # Disabled, a section is a no-op. tracemalloc counts the allocations of the whole process and slows
+    # every session down while it runs, so it is only started for a server profiled as a whole
+    # and the memory figures include the other sessions running at the same time.
+
+    def __init__(self, enabled=False, trace_memory=False, log_path=PROFILE_LOG):
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self.log_path = log_path
+        self.run_id = None
+        self.records = []
+        # Sections currently open, the innermost last
+        self.stack = []
+
+    def start_run(self):
+        # Called at the start of every full rerun, fragment reruns add to the records of the last one
+        self.run_id = uuid.uuid4().hex[:8]
+        self.records = []
+        self.stack = []
+        if self.enabled and self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def section(self, name):
+        if not self.enabled:
+            yield
+            return
+        if not self.trace_memory:
+            yield from self.timed_section(name)
+            return
+
+        current, peak = tracemalloc.get_traced_memory()
+        # The peak is reset for this section, the enclosing one keeps the peak reached so far
+        if self.stack:
+            self.stack[-1]['peak'] = max(self.stack[-1]['peak'], peak)
+        tracemalloc.reset_peak()
+        frame = {'name': name, 'before': current, 'peak': current, 'start': time.perf_counter()}
+        self.stack.append(frame)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - frame['start']
+            current, peak = tracemalloc.get_traced_memory()
+            self.stack.pop()
+            frame['peak'] = max(frame['peak'], peak)
+            if self.stack:
+                self.stack[-1]['peak'] = max(self.stack[-1]['peak'], frame['peak'])
+            self.record({
+                'run_id': self.run_id,
+                'section': '/'.join([parent['name'] for parent in self.stack] + [name]),
+                'ms': round(1000 * elapsed, 3),
+                'allocated_kb': round((current - frame['before']) / 1024, 1),
+                'peak_kb': round((frame['peak'] - frame['before']) / 1024, 1),
+                'timestamp': datetime.now(timezone.utc).isoformat()
+            })
+
+    def timed_section(self, name):
+        # Same records without the memory figures
+        frame = {'name': name, 'start': time.perf_counter()}
+        self.stack.append(frame)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - frame['start']
+            self.stack.pop()
+            self.record({
+                'run_id': self.run_id,
+                'section': '/'.join([parent['name'] for parent in self.stack] + [name]),
+                'ms': round(1000 * elapsed, 3),
+                'allocated_kb': None,
+                'peak_kb': None,
+                'timestamp': datetime.now(timezone.utc).isoformat()
+            })
+
+    def record(self, record):
+        self.records.append(record)
+        # Without a log path the records are only kept in memory
+        if self.log_path is None:
+            return
+        with open(self.log_path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(record) + '\n')
+
+
+def profiled(name, show=False):
+    # Method decorator timing the whole method as one section of self.profiler.
+    # With show, the records of the call are passed to self.show_profile once it returned
+    def decorator(func):
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            start = len(self.profiler.records)
+            with self.profiler.section(name):
+                result = func(self, *args, **kwargs)
+            if show and self.profiler.enabled:
+                self.show_profile(self.profiler.records[start:])
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,83 @@
+import argparse
+import random
+import time
+from inflation.database import get_client
+from inflation.deadletter import DeadLetterQueue, DEAD_LETTER_FILE
+
+
+def submit(client, table_name, on_conflict, records, attempts, base_delay):
+    # Upsert one batch, waiting base_delay * 2^n (plus jitter) between attempts
+    for attempt in range(attempts):
+        try:
+            query = client.table(table_name)
+            if on_conflict:
+                query.upsert(records, on_conflict=on_conflict).execute()
+            else:
+                query.insert(records).execute()
+            return None
+        except Exception as e:
+            error = e
+            if attempt < attempts - 1:
+                delay = base_delay * 2 ** attempt
+                time.sleep(delay + random.uniform(0, delay))
+    return error
+
+
+def submit_split(client, table_name, on_conflict, batch, attempts, base_delay):
+    # One bad record would keep the whole batch failing: a batch that still fails is split in halves
+    # that are submitted on their own, down to single entries. Returns the failed entries and errors
+    error = submit(client, table_name, on_conflict, [entry['record'] for entry in batch], attempts, base_delay)
+    if error is None:
+        return []
+    if len(batch) == 1:
+        return [(batch[0], error)]
+
+    half = len(batch) // 2
+    return submit_split(client, table_name, on_conflict, batch[:half], attempts, base_delay) + \
+        submit_split(client, table_name, on_conflict, batch[half:], attempts, base_delay)
+
+
+def replay(client, queue, batch_size=100, attempts=5, base_delay=0.5):
+    entries, consumed = queue.load()
+    if not entries:
+        print("No dead letters to replay")
+        return 0
+
+    # Batches only mix entries written to the same table with the same conflict target
+    groups = {}
+    for entry in entries:
+        groups.setdefault((entry['table'], entry.get('on_conflict')), []).append(entry)
+
+    remaining = []
+    for (table_name, on_conflict), group in groups.items():
+        for start in range(0, len(group), batch_size):
+            batch = group[start:start + batch_size]
+            failed = submit_split(client, table_name, on_conflict, batch, attempts, base_delay)
+            print(f"Replayed {len(batch) - len(failed)} of {len(batch)} items into {table_name}")
+
+            for entry, error in failed:
+                print(f"Error replaying into {table_name}: {error}")
+                entry['error'] = str(error)
+                entry['retries'] = entry.get('retries', 0) + 1
+                remaining.append(entry)
+
+    # Only the entries that still failed stay in the queue
+    queue.replace(remaining, consumed)
+    print(f"Replayed {len(entries) - len(remaining)} of {len(entries)} dead letters")
+    return len(remaining)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-submit the item writes spooled to the dead letter file.")
+    parser.add_argument('--file', default=DEAD_LETTER_FILE, help="Dead letter file")
+    parser.add_argument('--batch-size', type=int, default=100, help="Items per upsert")
+    parser.add_argument('--attempts', type=int, default=5, help="Attempts per batch before it is kept in the file")
+    parser.add_argument('--base-delay', type=float, default=0.5, help="Seconds before the first retry, doubled after each")
+    args = parser.parse_args()
+
+    remaining = replay(get_client(), DeadLetterQueue(args.file), args.batch_size, args.attempts, args.base_delay)
+    raise SystemExit(1 if remaining else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,8 @@
+-- Dataset versions stamped when a crawl changed the stored data, the latest one keys the caches
+-- of the app and the API. Two crawls stamping the same version at once conflict on the key.
+create table if not exists dataset_version (
+    version integer primary key,
+    content_hash text not null,
+    rows integer not null,
+    created_at timestamptz not null default now()
+);
@@ -0,0 +1,11 @@
+-- Walk-forward backtest errors saved by `backtest.py --save`, one row per model, country and
+-- years ahead. The primary key is the conflict target of the upsert.
+create table if not exists forecast_errors (
+    model text not null,
+    country text not null,
+    horizon smallint not null check (horizon > 0),
+    mae double precision not null,
+    rmse double precision not null,
+    n integer not null,
+    primary key (model, country, horizon)
+);
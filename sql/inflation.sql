@@ -0,0 +1,15 @@
+-- Annual CPI inflation, one row per country and year.
+-- The unique index on (country, year) is the conflict target of the pipeline's upserts and of replay.py.
+create table if not exists inflation (
+    id bigint generated by default as identity primary key,
+    country text not null,
+    year smallint not null,
+    average_inflation real,
+    annual_inflation real
+);
+
+-- Tables created before the index may hold duplicate rows of a country and year, keep the first one
+delete from inflation a using inflation b
+where a.country = b.country and a.year = b.year and a.ctid > b.ctid;
+
+create unique index if not exists inflation_country_year on inflation (country, year);
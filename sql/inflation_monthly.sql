@@ -0,0 +1,21 @@
+-- Monthly CPI inflation, one row per country and month.
+-- The table is partitioned by decade so range-bounded reads (a country over a span of years)
+-- only scan the partitions of those years.
+create table if not exists inflation_monthly (
+    country text not null,
+    year smallint not null,
+    month smallint not null check (month between 1 and 12),
+    monthly_inflation real,
+    yearly_inflation real,
+    primary key (country, year, month)
+) partition by range (year);
+
+create table if not exists inflation_monthly_1950s partition of inflation_monthly for values from (1950) to (1960);
+create table if not exists inflation_monthly_1960s partition of inflation_monthly for values from (1960) to (1970);
+create table if not exists inflation_monthly_1970s partition of inflation_monthly for values from (1970) to (1980);
+create table if not exists inflation_monthly_1980s partition of inflation_monthly for values from (1980) to (1990);
+create table if not exists inflation_monthly_1990s partition of inflation_monthly for values from (1990) to (2000);
+create table if not exists inflation_monthly_2000s partition of inflation_monthly for values from (2000) to (2010);
+create table if not exists inflation_monthly_2010s partition of inflation_monthly for values from (2010) to (2020);
+create table if not exists inflation_monthly_2020s partition of inflation_monthly for values from (2020) to (2030);
+create table if not exists inflation_monthly_default partition of inflation_monthly default;
@@ -0,0 +1,16 @@
+-- Summary statistics materialized by the SummaryStatisticsPipeline, one row per year or country
+-- and inflation column. The primary key is the conflict target of the pipeline's upsert.
+create table if not exists inflation_summary (
+    scope text not null check (scope in ('year', 'country')),
+    key text not null,
+    "column" text not null,
+    count integer not null,
+    mean double precision,
+    std double precision,
+    min double precision,
+    q25 double precision,
+    q50 double precision,
+    q75 double precision,
+    max double precision,
+    primary key (scope, key, "column")
+);
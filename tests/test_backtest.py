@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from backtest import regression_errors
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(0)
+    years = np.arange(1960, 2000, dtype=float)
+    values = 2 + 0.1 * (years - 1960) + rng.normal(0, 1, len(years))
+    return years, values
+
+
+@pytest.mark.parametrize('degree', [1, 3])
+def test_matches_polyfit_on_expanding_windows(series, degree):
+    years, values = series
+    min_train, horizons = 20, 5
+    errors = regression_errors(years, values, degree, min_train, horizons)
+    assert errors.shape == (len(years) - min_train, horizons)
+
+    for row, origin in enumerate(range(min_train, len(years))):
+        fit = np.poly1d(np.polyfit(years[:origin], values[:origin], degree))
+        for h in range(horizons):
+            target = origin + h
+            if target < len(years):
+                assert errors[row, h] == pytest.approx(fit(years[target]) - values[target], abs=1e-6)
+
+
+def test_targets_past_the_end_are_nan(series):
+    years, values = series
+    errors = regression_errors(years, values, 1, 20, 5)
+    assert not np.isnan(errors[:-4]).any()
+    assert np.isnan(errors[-1, 1:]).all()
+    assert not np.isnan(errors[:, 0]).any()
+
+
+def test_short_series_has_no_errors(series):
+    years, values = series
+    assert regression_errors(years[:20], values[:20], 1, 20, 5) is None
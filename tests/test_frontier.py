@@ -0,0 +1,106 @@
+import pytest
+from inflation import frontier as frontier_module
+from inflation.frontier import Frontier, MAX_ATTEMPTS
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(frontier_module.time, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def frontier(tmp_path, clock):
+    frontier = Frontier(str(tmp_path / 'frontier.sqlite3'), lease_seconds=60)
+    yield frontier
+    frontier.close()
+
+
+def test_push_keeps_each_url_once(frontier):
+    assert frontier.push('https://a', 'parse', {'page': 1})
+    assert not frontier.push('https://a', 'parse_monthly')
+    assert frontier.lease('shard-0', 10) == [('https://a', 'parse', {'page': 1})]
+
+
+def test_leased_urls_are_not_leased_again(frontier):
+    for url in ('https://a', 'https://b', 'https://c'):
+        frontier.push(url)
+    first = frontier.lease('shard-0', 2)
+    second = frontier.lease('shard-1', 10)
+    assert len(first) == 2
+    assert len(second) == 1
+    assert {url for url, _, _ in first + second} == {'https://a', 'https://b', 'https://c'}
+    assert frontier.lease('shard-2', 10) == []
+
+
+def test_ack_finishes_the_frontier(frontier):
+    frontier.push('https://a')
+    frontier.lease('shard-0', 1)
+    assert not frontier.is_finished()
+    frontier.ack('https://a')
+    assert frontier.counts() == {'done': 1}
+    assert frontier.is_finished()
+    assert frontier.lease('shard-0', 1) == []
+
+
+def test_release_gives_the_url_back(frontier):
+    frontier.push('https://a')
+    frontier.lease('shard-0', 1)
+    frontier.release('https://a')
+    assert frontier.counts() == {'pending': 1}
+    assert [url for url, _, _ in frontier.lease('shard-1', 1)] == ['https://a']
+
+
+def test_expired_lease_is_leased_again(frontier, clock):
+    frontier.push('https://a')
+    frontier.lease('shard-0', 1)
+    clock.now += 30
+    assert frontier.lease('shard-1', 1) == []
+    clock.now += 31
+    assert [url for url, _, _ in frontier.lease('shard-1', 1)] == ['https://a']
+
+
+def test_url_is_abandoned_after_max_attempts(frontier, clock):
+    frontier.push('https://a')
+    frontier.push('https://b')
+    for _ in range(MAX_ATTEMPTS):
+        for url, _, _ in frontier.lease('shard-0', 10):
+            if url == 'https://a':
+                frontier.ack(url)
+            else:
+                frontier.release(url)
+    assert frontier.lease('shard-0', 10) == []
+    assert frontier.is_finished()
+    assert frontier.abandoned() == ['https://b']
+
+
+def test_live_lease_on_last_attempt_is_not_abandoned(frontier, clock):
+    frontier.push('https://a')
+    for _ in range(MAX_ATTEMPTS):
+        clock.now += 61
+        frontier.lease('shard-0', 1)
+    assert frontier.abandoned() == []
+    clock.now += 61
+    assert frontier.abandoned() == ['https://a']
+
+
+def test_retry_abandoned_resets_the_attempts(frontier):
+    frontier.push('https://a')
+    for _ in range(MAX_ATTEMPTS):
+        frontier.lease('shard-0', 1)
+        frontier.release('https://a')
+    assert frontier.abandoned() == ['https://a']
+
+    assert frontier.retry_abandoned() == 1
+    assert frontier.abandoned() == []
+    assert not frontier.is_finished()
+    assert [url for url, _, _ in frontier.lease('shard-1', 1)] == ['https://a']
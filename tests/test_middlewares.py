@@ -0,0 +1,73 @@
+import logging
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+from inflation.items import InflationItem, MonthlyInflationItem
+from inflation.middlewares import ItemDeduplicationMiddleware
+
+
+class Stats:
+    def __init__(self):
+        self.values = Counter()
+
+    def inc_value(self, key, count=1, start=0):
+        self.values[key] += count
+
+
+@pytest.fixture
+def spider():
+    return SimpleNamespace(logger=logging.getLogger('test'))
+
+
+def middleware():
+    return ItemDeduplicationMiddleware(Stats())
+
+
+def annual(**values):
+    item = {'country': 'Germany', 'year': 2020, 'average_inflation': '0.5', 'annual_inflation': '-0.3'}
+    item.update(values)
+    return InflationItem(**item)
+
+
+def test_unique_items_are_kept(spider):
+    dedup = middleware()
+    assert dedup.keep(annual(), spider)
+    assert dedup.keep(annual(year=2021), spider)
+    assert dedup.keep(annual(country='France'), spider)
+    assert dedup.stats.values['item_dedup/unique'] == 3
+
+
+def test_item_types_do_not_collide(spider):
+    dedup = middleware()
+    assert dedup.keep(annual(), spider)
+    assert dedup.keep(MonthlyInflationItem(country='Germany', year=2020, month=None,
+                                           monthly_inflation='0.1', yearly_inflation='1.0'), spider)
+
+
+def test_exact_duplicate_is_dropped(spider):
+    dedup = middleware()
+    assert dedup.keep(annual(), spider)
+    assert not dedup.keep(annual(), spider)
+    assert dedup.stats.values['item_dedup/exact_dropped'] == 1
+    assert dedup.stats.values['item_dedup/conflicts'] == 0
+
+
+def test_conflict_keeps_the_item_with_more_values(spider):
+    dedup = middleware()
+    assert dedup.keep(annual(annual_inflation='-'), spider)
+    assert dedup.keep(annual(), spider)
+    assert not dedup.keep(annual(average_inflation=''), spider)
+    assert dedup.stats.values['item_dedup/conflicts'] == 2
+    assert dedup.stats.values['item_dedup/conflicts_replaced'] == 1
+    assert dedup.stats.values['item_dedup/conflicts_dropped'] == 1
+
+
+def kept(items, spider):
+    dedup = middleware()
+    return [dict(item) for item in items if dedup.keep(item, spider)][-1]
+
+
+def test_conflict_winner_does_not_depend_on_order(spider):
+    first, second = annual(annual_inflation='-0.3'), annual(annual_inflation='-0.4')
+    assert kept([first, second], spider) == kept([second, first], spider)